@@ -0,0 +1,173 @@
+from flask import Flask, request, jsonify
+import os
+import threading
+import time
+
+from classifier import classifier_from_env, template_dir_from_env
+from contract import contract_analyzer_from_env
+from extract import load_extractors
+from llm import llm_from_env
+
+app = Flask(__name__)
+
+classifier = classifier_from_env()
+extractors = load_extractors(template_dir_from_env(), float(os.getenv('ANALYZER_MIN_CONFIDENCE', '0.8')))
+llm = llm_from_env()
+contract_analyzer = contract_analyzer_from_env(template_dir_from_env(), llm)
+
+# Documents classified per type since start
+classified = {}
+classified_lock = threading.Lock()
+
+# Per document type: documents analyzed, LLM calls, fields filled by rules and
+# by the LLM, and time spent in each
+extraction_stats = {}
+extraction_lock = threading.Lock()
+
+# Contracts analyzed in chunks: documents, chunks, failed chunks and wall time
+contract_stats = {'documents': 0, 'chunks': 0, 'failed_chunks': 0, 'elapsed_ms': 0.0}
+
+
+def request_text(*names):
+    """Text plus the named parameters, from a JSON body or a text/plain body with query parameters
+
+    With a text/plain body the filename may also come in an X-Filename header,
+    which unlike a query parameter needs no URL encoding.
+    """
+    if request.is_json:
+        payload = request.get_json(silent=True) or {}
+        return payload.get('text'), [payload.get(name) for name in names]
+    values = [request.args.get(name) for name in names]
+    if 'filename' in names:
+        index = names.index('filename')
+        values[index] = values[index] or request.headers.get('X-Filename')
+    return request.get_data(as_text=True), values
+
+
+def record_extraction(document_type, rule_fields, llm_fields, extract_us, llm_ms):
+    with extraction_lock:
+        stats = extraction_stats.setdefault(document_type, {
+            'documents': 0, 'llm_calls': 0, 'rule_fields': 0, 'llm_fields': 0, 'extract_us': 0.0, 'llm_ms': 0.0
+        })
+        stats['documents'] += 1
+        stats['llm_calls'] += llm_ms is not None
+        stats['rule_fields'] += rule_fields
+        stats['llm_fields'] += llm_fields
+        stats['extract_us'] += extract_us
+        stats['llm_ms'] += llm_ms or 0.0
+
+
+@app.route('/classify', methods=['POST'])
+def classify():
+    """Classify extracted text: JSON {"text", "filename"} or a text/plain body with ?filename= or X-Filename"""
+    text, (filename,) = request_text('filename')
+    if not isinstance(text, str):
+        return jsonify({'error': 'No text provided'}), 400
+
+    start = time.perf_counter()
+    result = classifier.classify(text, filename)
+    result['classify_us'] = round((time.perf_counter() - start) * 1e6, 1)
+    with classified_lock:
+        classified[result['document_type']] = classified.get(result['document_type'], 0) + 1
+    return jsonify(result)
+
+def analyze_contract(text):
+    if not text.strip():
+        return jsonify({'error': 'Contract text is empty'}), 400
+    analysis, chunking = contract_analyzer.analyze(text)
+    with extraction_lock:
+        contract_stats['documents'] += 1
+        contract_stats['chunks'] += chunking['chunks']
+        contract_stats['failed_chunks'] += len(chunking['failed'])
+        contract_stats['elapsed_ms'] += chunking['elapsed_ms']
+    analysis['chunking'] = chunking
+    if chunking['chunks'] and len(chunking['failed']) == chunking['chunks']:
+        # Nothing was analysed; on a 502 Node-RED falls back to its own LLM prompt, Camel fails the exchange
+        return jsonify({'error': f"All {chunking['chunks']} contract chunks failed: {chunking['failed'][0]['error']}",
+                        'chunking': chunking}), 502
+    return jsonify(analysis)
+
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    """
+    Extract the template fields of an invoice or certificate. Rules fill what
+    they can; the LLM is only asked for the fields they leave unresolved.
+    Contracts are split into section-aware chunks analysed concurrently and
+    merged into the contract template's schema.
+    Takes the same bodies as /classify plus document_type (classified if
+    omitted); ?llm=false skips the LLM for invoices and certificates.
+    """
+    text, (document_type, filename) = request_text('document_type', 'filename')
+    if not isinstance(text, str):
+        return jsonify({'error': 'No text provided'}), 400
+    document_type = (document_type or classifier.classify(text, filename)['document_type']).upper()
+    if document_type == 'CONTRACT' and contract_analyzer is not None:
+        return analyze_contract(text)
+    extractor = extractors.get(document_type)
+    if extractor is None:
+        return jsonify({'error': f'No extraction template for document type {document_type}'}), 422
+
+    start = time.perf_counter()
+    result = extractor.extract(text)
+    extract_us = (time.perf_counter() - start) * 1e6
+    # Low-confidence rule values are sent to the LLM but kept unless it answers
+    sources = {field: 'rules' for field in extractor.fields if result['fields'][field] is not None}
+
+    llm_ms, llm_error = None, None
+    use_llm = request.args.get('llm', 'true').lower() not in ('0', 'false', 'no')
+    if result['unresolved'] and use_llm:
+        start = time.perf_counter()
+        try:
+            answer = llm.generate(extractor.prompt(text, result))
+        except Exception as e:
+            answer, llm_error = {}, str(e)
+        llm_ms = (time.perf_counter() - start) * 1000
+        result = extractor.merge(result, answer)
+        sources.update({field: 'llm' for field in result['answered']})
+    rule_fields = [field for field, source in sources.items() if source == 'rules']
+    record_extraction(document_type, len(rule_fields), len(sources) - len(rule_fields), extract_us, llm_ms)
+
+    analysis = extractor.summary(result)
+    analysis['extraction'] = {
+        'document_type': document_type,
+        'sources': sources,
+        'confidence': result['confidence'],
+        'low_confidence': [field for field in rule_fields if result['confidence'][field] < extractor.min_confidence],
+        'unresolved': result['unresolved'],
+        'llm_called': llm_ms is not None,
+        'llm_error': llm_error,
+        'extract_us': round(extract_us, 1),
+        'llm_ms': round(llm_ms, 1) if llm_ms is not None else None
+    }
+    return jsonify(analysis)
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'healthy'})
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    with classified_lock:
+        counts = dict(classified)
+    with extraction_lock:
+        extraction = {document_type: dict(stats) for document_type, stats in extraction_stats.items()}
+        contracts = dict(contract_stats)
+    for stats in extraction.values():
+        documents, fields = stats['documents'], stats['rule_fields'] + stats['llm_fields']
+        stats['llm_call_rate'] = round(stats['llm_calls'] / documents, 3)
+        stats['rule_field_rate'] = round(stats['rule_fields'] / fields, 3) if fields else None
+        stats['mean_extract_us'] = round(stats.pop('extract_us') / documents, 1)
+        stats['mean_llm_ms'] = round(stats['llm_ms'] / stats['llm_calls'], 1) if stats['llm_calls'] else None
+        stats['mean_document_ms'] = round((stats['mean_extract_us'] / 1000) + stats.pop('llm_ms') / documents, 2)
+    return jsonify({
+        'classified': counts,
+        'labels': classifier.labels,
+        'max_chars': classifier.max_chars,
+        'extraction': extraction,
+        'contracts': {
+            **contracts,
+            'mean_chunks': round(contracts['chunks'] / contracts['documents'], 1) if contracts['documents'] else None,
+            'elapsed_ms': round(contracts['elapsed_ms'], 1)
+        }
+    })
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Classifier benchmark and accuracy report.
+
+Classifies the labelled texts in sample-docs/classifier-eval.jsonl plus any
+non-empty PDFs in sample-docs/ (labelled by their sample-<type>.pdf name,
+text extracted with pdfminer if it is installed). It compares the result
+with the filename rule the Node-RED flow used before, and times
+classification per document.
+
+Usage: python3 bench_classifier.py [--iterations 2000] [--output classifier.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from classifier import UNKNOWN, classifier_from_env
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_DOCS = os.path.join(HERE, '..', '..', 'sample-docs')
+
+
+def load_eval_set():
+    docs = []
+    with open(os.path.join(SAMPLE_DOCS, 'classifier-eval.jsonl'), 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                docs.append(json.loads(line))
+    skipped = []
+    for path in sorted(glob.glob(os.path.join(SAMPLE_DOCS, 'sample-*.pdf'))):
+        name = os.path.basename(path)
+        if os.path.getsize(path) == 0:
+            skipped.append(f'{name}: empty file')
+            continue
+        try:
+            from pdfminer.high_level import extract_text
+        except ImportError:
+            skipped.append(f'{name}: pdfminer.six not installed')
+            continue
+        label = name[len('sample-'):-len('.pdf')].upper()
+        docs.append({'filename': name, 'label': label, 'text': extract_text(path)})
+    return docs, skipped
+
+
+def filename_rule(filename):
+    """The filename matching from the 'Classify Document Type' node"""
+    name = filename.lower()
+    if 'cor' in name or 'certificate' in name:
+        return 'COR'
+    if 'invoice' in name or 'faktura' in name:
+        return 'INVOICE'
+    if 'contract' in name or 'umowa' in name:
+        return 'CONTRACT'
+    return UNKNOWN
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+
+def accuracy_report(docs, predict):
+    correct, confusion, errors = 0, {}, []
+    for doc in docs:
+        predicted = predict(doc)
+        confusion.setdefault(doc['label'], {}).setdefault(predicted, 0)
+        confusion[doc['label']][predicted] += 1
+        if predicted == doc['label']:
+            correct += 1
+        else:
+            errors.append({'filename': doc['filename'], 'label': doc['label'], 'predicted': predicted})
+    return {
+        'documents': len(docs),
+        'accuracy': round(correct / len(docs), 3) if docs else None,
+        'confusion': confusion,
+        'errors': errors
+    }
+
+
+def time_classification(classifier, docs, iterations):
+    samples = []
+    for i in range(iterations):
+        doc = docs[i % len(docs)]
+        start = time.perf_counter()
+        classifier.classify(doc['text'], doc['filename'])
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'mean_us': round(sum(samples) / len(samples), 2),
+        'p50_us': percentile(samples, 50),
+        'p99_us': percentile(samples, 99),
+        'max_us': percentile(samples, 100),
+        'docs_per_second': round(len(samples) / (sum(samples) / 1e6))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the document type classifier')
+    parser.add_argument('--iterations', type=int, default=2000, help='Classifications to time')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    classifier = classifier_from_env()
+    docs, skipped = load_eval_set()
+    if not docs:
+        parser.error('no labelled documents found')
+
+    # The same documents padded to the classifier's window, as with real extracted text
+    long_docs = [dict(doc, text=(doc['text'] + '\n') * (classifier.max_chars // max(1, len(doc['text'])) + 1))
+                 for doc in docs]
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'skipped': skipped,
+        'content': accuracy_report(docs, lambda doc: classifier.classify(doc['text'], doc['filename'])
+                                   ['document_type']),
+        'filename_rule': accuracy_report(docs, lambda doc: filename_rule(doc['filename'])),
+        'latency': {
+            'eval_texts': time_classification(classifier, docs, args.iterations),
+            f'{classifier.max_chars}_chars': time_classification(classifier, long_docs, args.iterations)
+        }
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'✅ Report written to {args.output}', file=sys.stderr)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Long contract benchmark: single prompt versus chunked map-reduce analysis.
+
+Builds synthetic contracts of --pages pages (about 3,000 characters each,
+with the sections of templates/contract-analysis.json) and reports, for
+each size:
+  - single prompt: how much of the text fits in the model context
+    (--num-ctx tokens at about 4 characters per token), the rest being
+    silently truncated;
+  - chunked: chunk count, overlap overhead, text coverage and the required
+    sections found by the splitter;
+  - wall time of the chunked analysis for 1 to --workers workers.
+
+LLM calls go to a running Ollama with --ollama-url. Without it, each call
+sleeps --simulated-ms per 1,000 prompt characters and the report marks the
+latency as simulated.
+
+Usage: python3 bench_contract.py [--pages 10 40 80] [--workers 4] [--ollama-url http://localhost:11434]
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from classifier import template_dir_from_env
+from contract import ContractAnalyzer, chunk_text
+from llm import OllamaClient
+
+CHARS_PER_TOKEN = 4
+# Tokens the single prompt needs besides the document: instructions and the answer
+PROMPT_RESERVE_TOKENS = 600
+
+SECTIONS = [
+    ('THE PARTIES', 'The Supplier and the Customer, each a party, enter into this agreement on the effective date.'),
+    ('SCOPE OF WORK', 'The Supplier shall deliver the maintenance services and deliverables set out in Annex {n}.'),
+    ('PAYMENT TERMS', 'The Customer shall pay the fees of EUR {n},000 within 30 days of each accepted invoice.'),
+    ('TERM', 'This agreement runs for {n} months from the effective date and renews for equal periods.'),
+    ('TERMINATION', 'Either party may terminate this agreement with {n} days written notice for material breach.'),
+    ('LIMITATION OF LIABILITY', 'Liability of either party is limited to {n}0 percent of the fees paid in the year.'),
+    ('GOVERNING LAW AND DISPUTES', 'Disputes are settled by arbitration; clause {n} applies to all claims.')
+]
+
+
+class SimulatedLLM:
+    def __init__(self, ms_per_kchar):
+        self.ms_per_kchar = ms_per_kchar
+
+    def generate(self, prompt):
+        time.sleep(len(prompt) / 1000 * self.ms_per_kchar / 1000)
+        return {'confidence_score': 0.9}
+
+
+def synthetic_contract(pages, page_chars=3000):
+    """A contract of about pages * page_chars characters with numbered clauses per section"""
+    target = pages * page_chars
+    parts = []
+    size, number = 0, 0
+    while size < target:
+        heading, clause = SECTIONS[number % len(SECTIONS)]
+        number += 1
+        parts.append(f'\n{number}. {heading}\n')
+        for sub in range(1, 9):
+            paragraph = ' '.join(clause.format(n=number * 10 + sub) for _ in range(3))
+            parts.append(f'{number}.{sub} {paragraph}\n\n')
+        size = sum(len(part) for part in parts)
+    return ''.join(parts)
+
+
+def coverage(text, chunks):
+    covered, end = 0, 0
+    for chunk in sorted(chunks, key=lambda c: c.start):
+        covered += max(0, chunk.end - max(chunk.start, end))
+        end = max(end, chunk.end)
+    return covered / len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark chunked contract analysis')
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 40, 80], help='Contract sizes in pages')
+    parser.add_argument('--workers', type=int, default=4, help='Highest worker count to time')
+    parser.add_argument('--max-chars', type=int, default=4000, help='Chunk size in characters')
+    parser.add_argument('--overlap', type=int, default=300, help='Chunk overlap in characters')
+    parser.add_argument('--num-ctx', type=int, default=4096, help='Model context window in tokens')
+    parser.add_argument('--ollama-url', help='Send the chunks to this Ollama server')
+    parser.add_argument('--model', default='llama2:13b', help='Model for --ollama-url')
+    parser.add_argument('--simulated-ms', type=float, default=50.0,
+                        help='Simulated LLM milliseconds per 1,000 prompt characters without --ollama-url')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    with open(f'{template_dir_from_env()}/contract-analysis.json', 'r', encoding='utf-8') as f:
+        template = json.load(f)
+    llm = OllamaClient(args.ollama_url, args.model) if args.ollama_url else SimulatedLLM(args.simulated_ms)
+    context_chars = (args.num_ctx - PROMPT_RESERVE_TOKENS) * CHARS_PER_TOKEN
+
+    sizes = []
+    for pages in args.pages:
+        text = synthetic_contract(pages)
+        start = time.perf_counter()
+        chunks = chunk_text(text, args.max_chars, args.overlap)
+        chunk_ms = (time.perf_counter() - start) * 1000
+        found = sorted({section for chunk in chunks for section in chunk.sections})
+        wall = {}
+        for workers in sorted({1, 2, args.workers}):
+            analyzer = ContractAnalyzer(template, llm, args.max_chars, args.overlap, workers)
+            _, chunking = analyzer.analyze(text)
+            wall[f'{workers}_workers_ms'] = chunking['elapsed_ms']
+        sizes.append({
+            'pages': pages,
+            'text_chars': len(text),
+            'single_prompt': {
+                'estimated_tokens': len(text) // CHARS_PER_TOKEN + PROMPT_RESERVE_TOKENS,
+                'coverage': round(min(1.0, context_chars / len(text)), 3)
+            },
+            'chunked': {
+                'chunks': len(chunks),
+                'largest_chunk_chars': max(len(chunk.text) for chunk in chunks),
+                'overlap_overhead': round(sum(len(chunk.text) for chunk in chunks) / len(text) - 1, 3),
+                'coverage': round(coverage(text, chunks), 3),
+                'sections_found': f"{len(found)}/{len(template['analysis_criteria']['required_sections'])}",
+                'chunking_ms': round(chunk_ms, 2),
+                'wall_time': wall
+            }
+        })
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'llm_latency': 'measured' if args.ollama_url else f'simulated {args.simulated_ms:g} ms per 1,000 chars',
+        'num_ctx': args.num_ctx,
+        'max_chars': args.max_chars,
+        'overlap': args.overlap,
+        'sizes': sizes
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'✅ Report written to {args.output}', file=sys.stderr)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
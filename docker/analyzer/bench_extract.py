@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Field extraction benchmark: LLM calls and latency before and after the
+rule-based pre-extraction.
+
+Uses the INVOICE and COR texts in sample-docs/classifier-eval.jsonl. Before,
+every document was sent to the LLM with the full "Prepare LLM Analysis"
+prompt; after, the rules run first and the LLM only gets the fields they
+leave unresolved. The report gives the LLM call rate, the share of fields
+resolved by rules, their accuracy against the "fields" labels, extraction
+latency, and the mean latency per document.
+
+LLM latency is measured against a running Ollama with --ollama-url (both the
+full and the reduced prompts are timed). Without it, --llm-ms is used for
+every call and the report marks it as assumed.
+
+Usage: python3 bench_extract.py [--iterations 2000] [--ollama-url http://localhost:11434] [--output extract.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from bench_classifier import SAMPLE_DOCS, percentile
+from classifier import template_dir_from_env
+from extract import load_extractors
+from llm import OllamaClient
+
+# The prompts the Node-RED flow sent for every document before
+FULL_PROMPTS = {
+    'INVOICE': 'Extract invoice data:\n\n{text}\n\nReturn JSON:\n{{\n  "invoice_number": "",\n  "date": "",\n'
+               '  "supplier_name": "",\n  "total_amount": 0.0,\n  "currency": "",\n  "due_date": "",\n'
+               '  "validation_status": "VALID|INVALID",\n  "confidence_score": 0.95\n}}',
+    'COR': 'Analyze this Certificate of Conformity document. Extract key information:\n\n{text}\n\nReturn JSON:\n'
+           '{{\n  "certificate_number": "",\n  "issuing_authority": "",\n  "product_name": "",\n'
+           '  "compliance_status": "COMPLIANT|NON_COMPLIANT|UNCLEAR",\n  "validity_start": "",\n'
+           '  "validity_end": "",\n  "issues_found": [],\n  "confidence_score": 0.95\n}}'
+}
+
+
+def load_documents(extractors):
+    docs = []
+    with open(os.path.join(SAMPLE_DOCS, 'classifier-eval.jsonl'), 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                doc = json.loads(line)
+                if doc['label'] in extractors:
+                    docs.append(doc)
+    return docs
+
+
+def time_extraction(extractors, docs, iterations):
+    samples = []
+    for i in range(iterations):
+        doc = docs[i % len(docs)]
+        start = time.perf_counter()
+        extractors[doc['label']].extract(doc['text'])
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'mean_us': round(sum(samples) / len(samples), 2),
+        'p50_us': percentile(samples, 50),
+        'p99_us': percentile(samples, 99),
+        'max_us': percentile(samples, 100)
+    }
+
+
+def timed_generate(client, prompt):
+    start = time.perf_counter()
+    client.generate(prompt)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rule-based field extraction against LLM-only')
+    parser.add_argument('--iterations', type=int, default=2000, help='Extractions to time')
+    parser.add_argument('--ollama-url', help='Measure LLM latency against this Ollama server')
+    parser.add_argument('--model', default=os.getenv('LLM_MODEL', 'llama2:13b'), help='Model for --ollama-url')
+    parser.add_argument('--llm-ms', type=float, default=8000.0,
+                        help='LLM latency per call to assume when --ollama-url is not given')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    extractors = load_extractors(template_dir_from_env())
+    docs = load_documents(extractors)
+    if not docs:
+        parser.error('no INVOICE or COR documents found')
+    client = OllamaClient(args.ollama_url, args.model) if args.ollama_url else None
+
+    fields_total = rule_fields = labelled = correct = llm_calls = 0
+    errors = []
+    full_ms, reduced_ms = [], []
+    for doc in docs:
+        extractor = extractors[doc['label']]
+        result = extractor.extract(doc['text'])
+        fields_total += len(extractor.fields)
+        rule_fields += len(extractor.fields) - len(result['unresolved'])
+        for field, expected in doc.get('fields', {}).items():
+            if field in result['unresolved']:
+                continue
+            labelled += 1
+            if result['fields'][field] == expected:
+                correct += 1
+            else:
+                errors.append({'filename': doc['filename'], 'field': field, 'expected': expected,
+                               'extracted': result['fields'][field]})
+        if client:
+            full_ms.append(timed_generate(client, FULL_PROMPTS[doc['label']].format(text=doc['text'])))
+        if result['unresolved']:
+            llm_calls += 1
+            if client:
+                reduced_ms.append(timed_generate(client, extractor.prompt(doc['text'], result)))
+
+    extraction = time_extraction(extractors, docs, args.iterations)
+    before_llm_ms = sum(full_ms) / len(full_ms) if full_ms else args.llm_ms
+    after_llm_ms = sum(reduced_ms) / len(reduced_ms) if reduced_ms else before_llm_ms
+    call_rate = llm_calls / len(docs)
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'documents': len(docs),
+        'llm_latency': 'measured' if client else f'assumed {args.llm_ms:g} ms per call',
+        'before': {
+            'llm_call_rate': 1.0,
+            'rule_field_rate': 0.0,
+            'mean_llm_ms': round(before_llm_ms, 1),
+            'mean_document_ms': round(before_llm_ms, 1)
+        },
+        'after': {
+            'llm_call_rate': round(call_rate, 3),
+            'rule_field_rate': round(rule_fields / fields_total, 3),
+            'rule_field_accuracy': round(correct / labelled, 3) if labelled else None,
+            'mean_llm_ms': round(after_llm_ms, 1),
+            'mean_document_ms': round(extraction['mean_us'] / 1000 + call_rate * after_llm_ms, 1)
+        },
+        'extraction': extraction,
+        'errors': errors
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'✅ Report written to {args.output}', file=sys.stderr)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
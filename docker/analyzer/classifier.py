@@ -0,0 +1,205 @@
+"""
+Content-based document type classifier.
+
+Scores the first few KB of extracted text against weighted keyword lists,
+one per document type. The lists are seeded from templates/*-analysis.json
+(document type name, required fields and sections, validation and risk
+vocabulary) and extended with the phrases and identifier patterns that
+appear on real invoices, certificates and contracts, in English and Polish.
+The text is split into word tokens once and phrases are looked up in a
+dict, extending a match only while it is still a prefix of some phrase, so
+classifying costs about one lookup per word of the first max_chars
+characters.
+
+The filename is only a weak prior: it breaks ties and lifts documents that
+have almost no text, but it never outweighs the content.
+"""
+
+import glob
+import json
+import os
+import re
+import string
+
+UNKNOWN = 'UNKNOWN'
+
+# ASCII punctuation becomes whitespace. Translating the UTF-8 bytes is several
+# times faster than a regex scan or str.translate on non-ASCII text, and is
+# safe because multi-byte sequences never contain ASCII bytes.
+ASCII_PUNCTUATION = bytes.maketrans(string.punctuation.encode(), b' ' * len(string.punctuation))
+UNICODE_PUNCTUATION = {'§': ' § ', **{c: ' ' for c in '„”“‘’–—…«»·•'}}
+
+# Phrases that identify a type beyond what the templates list. Weight 3 terms
+# are near-certain on their own; weight 1 terms only add evidence.
+EXTRA_TERMS = {
+    'INVOICE': {
+        3: ['invoice', 'faktura', 'faktura vat', 'invoice number', 'numer faktury', 'nip', 'amount due',
+            'do zapłaty', 'bill to', 'sprzedawca', 'nabywca', 'proforma'],
+        1: ['vat', 'net', 'gross', 'netto', 'brutto', 'subtotal', 'tax', 'qty', 'quantity', 'unit price',
+            'payment terms', 'bank account', 'iban', 'swift', 'termin płatności', 'razem', 'total',
+            'payment', 'płatność', 'supplier', 'customer', 'item']
+    },
+    'COR': {
+        3: ['certificate of conformity', 'declaration of conformity', 'certyfikat zgodności',
+            'deklaracja zgodności', 'certificate number', 'numer certyfikatu', 'ce marking', 'oznakowanie ce',
+            'conformity assessment', 'notified body', 'jednostka notyfikowana'],
+        1: ['certificate', 'certyfikat', 'conformity', 'zgodność', 'compliance', 'standard', 'norma',
+            'directive', 'dyrektywa', 'tested', 'test report', 'valid until', 'ważny do', 'manufacturer',
+            'producent', 'iso', 'en iso', 'inspection', 'certified', 'issued by']
+    },
+    'CONTRACT': {
+        3: ['agreement', 'contract', 'umowa', 'hereinafter', 'zwana dalej', 'the parties agree',
+            'strony postanawiają', 'in witness whereof', 'governing law', 'termination of this agreement'],
+        1: ['party', 'parties', 'strony', 'clause', 'klauzula', 'obligations', 'zobowiązania', 'term',
+            'indemnify', 'indemnification', 'confidentiality', 'poufność', 'jurisdiction', 'warranty',
+            'effective date', 'signature', 'podpis', 'force majeure', 'renewal', 'penalty', 'kara umowna',
+            'article', 'section', 'paragraf', '§']
+    }
+}
+
+# Identifier formats; a match weighs like a strong phrase. Patterns start with a
+# literal where possible so the regex engine can skip ahead to candidates.
+EXTRA_PATTERNS = {
+    'INVOICE': [r'(?:inv|fv)[-/ ]?\d{2,4}[-/]\d{1,6}\b'],
+    'COR': [r'cor-\d{4}-[a-z]{2,3}-\d{6}\b', r'en(?: iso)? \d{3,5}(?:-\d+)?\b'],
+    'CONTRACT': [r'§\s*\d+', r'article \d+\b']
+}
+
+# Generic words from field names that say nothing about the type
+STOPWORDS = {'date', 'name', 'number', 'status', 'type', 'period', 'items', 'terms', 'line', 'results'}
+
+
+def tokenize(text):
+    if not text.isascii():
+        for char, replacement in UNICODE_PUNCTUATION.items():
+            if char in text:
+                text = text.replace(char, replacement)
+    return text.encode('utf-8').translate(ASCII_PUNCTUATION).decode('utf-8').split()
+
+
+def template_terms(template):
+    """Weighted terms seeded from one analysis template"""
+    terms = {}
+    name = template.get('document_type', '')
+    for part in re.split(r'[/,]', name):
+        if part.strip():
+            terms[part.strip().lower()] = 3
+    criteria = template.get('analysis_criteria', {})
+    keys = criteria.get('required_fields', []) + criteria.get('required_sections', [])
+    for rule in criteria.get('validation_rules', []) + criteria.get('compliance_checks', []):
+        keys.append(rule.get('field', ''))
+        for standard in rule.get('required', []):
+            terms[standard.lower()] = 3
+    for key in keys:
+        phrase = key.replace('_', ' ').strip().lower()
+        if phrase:
+            terms.setdefault(phrase, 2)
+        for word in phrase.split():
+            if len(word) > 3 and word not in STOPWORDS:
+                terms.setdefault(word, 1)
+    return terms
+
+
+class Classifier:
+    def __init__(self, terms, patterns=None, max_chars=4096, min_score=4.0, filename_weight=2.0,
+                 max_hits_per_term=3):
+        """terms: {label: {phrase: weight}}, patterns: {label: [regex, ...]} (weight 3)"""
+        self.labels = sorted(terms)
+        self.max_chars = max_chars
+        self.min_score = min_score
+        self.filename_weight = filename_weight
+        self.max_hits_per_term = max_hits_per_term
+        self._weights = {}
+        self._prefixes = set()
+        for label, phrases in terms.items():
+            for phrase, weight in phrases.items():
+                words = tokenize(phrase)
+                self._weights.setdefault(' '.join(words), []).append((label, weight))
+                for end in range(1, len(words)):
+                    self._prefixes.add(' '.join(words[:end]))
+        self._patterns = [(label, re.compile(pattern)) for label, items in (patterns or {}).items()
+                          for pattern in items]
+
+    @classmethod
+    def from_templates(cls, template_dir, **kwargs):
+        terms = {label: {} for label in EXTRA_TERMS}
+        for path in sorted(glob.glob(os.path.join(template_dir, '*-analysis.json'))):
+            label = os.path.basename(path)[:-len('-analysis.json')].upper()
+            with open(path, 'r', encoding='utf-8') as f:
+                terms.setdefault(label, {}).update(template_terms(json.load(f)))
+        for label, by_weight in EXTRA_TERMS.items():
+            for weight, phrases in by_weight.items():
+                for phrase in phrases:
+                    terms[label][phrase] = max(weight, terms[label].get(phrase, 0))
+        return cls(terms, EXTRA_PATTERNS, **kwargs)
+
+    def filename_prior(self, filename):
+        """The old filename rule, used as weak evidence"""
+        name = (filename or '').lower()
+        if 'cor' in name or 'certificate' in name or 'certyfikat' in name:
+            return 'COR'
+        if 'invoice' in name or 'faktura' in name:
+            return 'INVOICE'
+        if 'contract' in name or 'umowa' in name:
+            return 'CONTRACT'
+        return None
+
+    def classify(self, text, filename=None):
+        """Return {'document_type', 'confidence', 'scores'} for the start of `text`"""
+        sample = (text or '')[:self.max_chars].lower()
+        scores = dict.fromkeys(self.labels, 0.0)
+        hits = {}
+        tokens = tokenize(sample)
+        weights, prefixes = self._weights, self._prefixes
+        i, n = 0, len(tokens)
+        while i < n:
+            words = tokens[i]
+            if words not in weights and words not in prefixes:
+                i += 1
+                continue
+            # Longest phrase starting at token i, so "faktura vat" wins over "faktura"
+            phrase, end, j = None, i + 1, i + 1
+            while True:
+                if words in weights:
+                    phrase, end = words, j
+                if words not in prefixes or j >= n:
+                    break
+                words = f'{words} {tokens[j]}'
+                j += 1
+            if phrase is not None:
+                count = hits.get(phrase, 0)
+                if count < self.max_hits_per_term:
+                    hits[phrase] = count + 1
+                    for label, weight in weights[phrase]:
+                        scores[label] += weight
+            i = end
+        for label, pattern in self._patterns:
+            if pattern.search(sample):
+                scores[label] += 3
+
+        prior = self.filename_prior(filename)
+        if prior in scores:
+            scores[prior] += self.filename_weight
+
+        best = max(self.labels, key=scores.__getitem__)
+        total = sum(scores.values())
+        if scores[best] < self.min_score:
+            return {'document_type': UNKNOWN, 'confidence': 0.0, 'scores': scores}
+        return {
+            'document_type': best,
+            'confidence': round(scores[best] / total, 3),
+            'scores': scores
+        }
+
+
+def template_dir_from_env():
+    return os.getenv('ANALYZER_TEMPLATE_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', '..', 'templates')
+
+
+def classifier_from_env():
+    return Classifier.from_templates(
+        template_dir_from_env(),
+        max_chars=int(os.getenv('CLASSIFIER_MAX_CHARS', '4096')),
+        min_score=float(os.getenv('CLASSIFIER_MIN_SCORE', '4'))
+    )
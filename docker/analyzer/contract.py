@@ -0,0 +1,314 @@
+"""
+Chunked map-reduce analysis of long contracts.
+
+A single prompt with the whole contract overflows the model context on long
+documents, so the tail is silently dropped. Instead the text is split at
+section headings (numbered clauses, "Article n", "§ n" or a line naming one
+of the template's required_sections), and the sections are packed into
+chunks of at most max_chars, with a short overlap carried over from the
+previous chunk so a clause cut at a boundary is seen whole once. Sections
+longer than a chunk are split at paragraph, then sentence boundaries.
+
+Each chunk is analysed by the LLM on its own (map), max_workers at a time,
+and the per-chunk answers are merged in Python into the template's schema
+(reduce): lists are united, scalars taken from the first chunk that states
+them, and the risk score is computed from the template's risk_assessment
+weights and red_flags. Latency grows with the number of chunks divided by
+the worker count, and every part of the document is analysed. If some
+chunks could not be analysed the risk level is UNKNOWN (or HIGH when the
+analysed chunks already raised a red flag) and the analysis is marked for
+review, since the missing parts may hold the risks.
+"""
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Heading words per required section, in English and Polish
+SECTION_TERMS = {
+    'parties': ['parties', 'the parties', 'strony', 'strony umowy'],
+    'scope_of_work': ['scope of work', 'scope', 'subject matter', 'subject of the agreement', 'services',
+                      'deliverables', 'przedmiot umowy', 'zakres prac'],
+    'financial_terms': ['financial terms', 'payment', 'payment terms', 'fees', 'price', 'remuneration',
+                        'compensation', 'wynagrodzenie', 'płatności', 'warunki płatności'],
+    'timeline': ['timeline', 'term', 'duration', 'schedule', 'term of agreement', 'effective date',
+                 'okres obowiązywania', 'harmonogram', 'termin realizacji'],
+    'termination_clauses': ['termination', 'term and termination', 'rozwiązanie umowy', 'wypowiedzenie',
+                            'odstąpienie od umowy'],
+    'liability_limitations': ['liability', 'limitation of liability', 'indemnification', 'indemnity',
+                              'odpowiedzialność', 'ograniczenie odpowiedzialności'],
+    'dispute_resolution': ['dispute resolution', 'disputes', 'governing law', 'arbitration', 'jurisdiction',
+                           'rozstrzyganie sporów', 'spory', 'prawo właściwe']
+}
+
+SECTION_PATTERNS = {section: re.compile(r'\b(?:' + '|'.join(map(re.escape, terms)) + r')\b')
+                    for section, terms in SECTION_TERMS.items()}
+
+# A numbered or lettered heading: "1.", "12.3", "Article 4", "Section 2", "§ 5", "Artykuł 3"
+NUMBERED_HEADING = re.compile(r'^\s*(?:(?:article|section|clause|artykuł|rozdział)\s+\d+|§\s*\d+|'
+                              r'\d{1,2}(?:\.\d{1,2})*\.?(?=\s+\S))[.:)]?\s*(.{0,80})$', re.I)
+SENTENCE_END = re.compile(r'(?<=[.;!?])\s+')
+RISK_LEVELS = (('HIGH', 0.5), ('MEDIUM', 0.2), ('LOW', 0.0))
+
+
+class Chunk:
+    __slots__ = ('index', 'start', 'end', 'text', 'sections')
+
+    def __init__(self, index, start, end, text, sections):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text = text
+        self.sections = sections
+
+
+def heading_section(line):
+    """(is_heading, required section or None) for one line of text"""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 100:
+        return False, None
+    numbered = NUMBERED_HEADING.match(stripped)
+    title = (numbered.group(1) if numbered else stripped).strip(' .:').lower()
+    if numbered or (stripped.isupper() and len(stripped) > 3):
+        for section, pattern in SECTION_PATTERNS.items():
+            if pattern.search(title):
+                return True, section
+        return True, None
+    # An unnumbered line is a heading only if it is short and starts with a section name
+    if len(stripped) <= 60 and not stripped.endswith(('.', ',', ';')):
+        for section, pattern in SECTION_PATTERNS.items():
+            if pattern.match(title):
+                return True, section
+    return False, None
+
+
+def split_sections(text):
+    """[(start, end, section or None)] spans of text, split at headings"""
+    spans, start, current = [], 0, None
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        is_heading, section = heading_section(line)
+        if is_heading and offset > start:
+            spans.append((start, offset, current))
+            start = offset
+        if is_heading:
+            current = section
+        offset += len(line)
+    if offset > start:
+        spans.append((start, offset, current))
+    return spans
+
+
+def split_long(text, start, end, max_chars):
+    """Split text[start:end] at paragraph, then sentence, then hard boundaries"""
+    pieces = []
+    while end - start > max_chars:
+        window = text[start:start + max_chars]
+        cut = window.rfind('\n\n')
+        if cut < max_chars // 2:
+            sentences = [m.end() for m in SENTENCE_END.finditer(window)]
+            cut = sentences[-1] if sentences and sentences[-1] >= max_chars // 2 else max_chars
+        pieces.append((start, start + cut))
+        start += cut
+    pieces.append((start, end))
+    return pieces
+
+
+def chunk_text(text, max_chars=4000, overlap=300):
+    """Section-aware overlapping chunks covering the whole text"""
+    if not text.strip():
+        return []
+    body = max(1, max_chars - overlap)
+    pieces = []
+    for start, end, section in split_sections(text):
+        pieces.extend((s, e, section) for s, e in split_long(text, start, end, body))
+
+    chunks, group = [], []
+    for piece in pieces + [None]:
+        if piece is not None and (not group or piece[1] - group[0][0] <= body):
+            group.append(piece)
+            continue
+        start, end = group[0][0], group[-1][1]
+        # Carry the end of the previous chunk over, starting at a line or sentence
+        context_start = start
+        if chunks and overlap:
+            context_start = max(0, start - overlap)
+            boundaries = [i for i in (text.find('\n', context_start, start), text.find('. ', context_start, start))
+                          if i >= 0]
+            if boundaries:
+                context_start = min(boundaries) + 1
+        sections = sorted({section for _, _, section in group if section})
+        chunks.append(Chunk(len(chunks), context_start, end, text[context_start:end].strip(), sections))
+        group = [piece] if piece is not None else []
+    return chunks
+
+
+def unique(values):
+    """Values in first-seen order without case-insensitive duplicates"""
+    seen, result = set(), []
+    for value in values:
+        marker = value.strip().lower() if isinstance(value, str) else repr(value)
+        if value not in (None, '') and marker not in seen:
+            seen.add(marker)
+            result.append(value)
+    return result
+
+
+def as_list(value):
+    if value in (None, ''):
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def as_number(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        digits = re.sub(r'[^\d.,]', '', value).replace(',', '')
+        try:
+            return float(digits)
+        except ValueError:
+            return None
+    return None
+
+
+class ContractAnalyzer:
+    def __init__(self, template, llm, max_chars=4000, overlap=300, max_workers=2):
+        criteria = template.get('analysis_criteria', {})
+        self.required_sections = criteria.get('required_sections', [])
+        self.risk_assessment = criteria.get('risk_assessment', {})
+        self.red_flags = template.get('red_flags', [])
+        self.approval_workflow = template.get('approval_workflow', {})
+        self.llm = llm
+        self.max_chars = max_chars
+        self.overlap = overlap
+        self.max_workers = max_workers
+
+    def prompt(self, chunk, total):
+        indicators = sorted({indicator for category in self.risk_assessment.values()
+                             for indicator in category.get('indicators', [])})
+        sections = ', '.join(chunk.sections) or 'not identified'
+        return (
+            f'This is part {chunk.index + 1} of {total} of a contract (sections: {sections}). Analyse only this '
+            f'part.\n\n{chunk.text}\n\n'
+            'Return only JSON:\n{\n'
+            '  "contract_type": "",\n  "parties": [],\n  "effective_date": "",\n  "expiration_date": "",\n'
+            '  "contract_value": 0.0,\n  "sections_found": [],\n  "key_terms": [],\n  "risk_factors": [],\n'
+            '  "risk_indicators": [],\n  "red_flags": [],\n  "compliance_requirements": [],\n'
+            '  "action_items": [],\n  "confidence_score": 0.0\n}\n'
+            f'sections_found may only use: {", ".join(self.required_sections)}.\n'
+            f'risk_indicators may only use: {", ".join(indicators)}.\n'
+            f'red_flags may only use: {", ".join(self.red_flags)}.\n'
+            'Leave values empty when this part does not mention them.'
+        )
+
+    def analyze(self, text):
+        """Return (analysis, chunking) for a whole contract"""
+        started = time.perf_counter()
+        chunks = chunk_text(text, self.max_chars, self.overlap)
+
+        def analyze_chunk(chunk):
+            try:
+                return self.llm.generate(self.prompt(chunk, len(chunks))), None
+            except Exception as e:
+                return {}, str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(chunks)))) as pool:
+            results = list(pool.map(analyze_chunk, chunks))
+
+        failed = [{'chunk': chunk.index, 'error': error} for chunk, (_, error) in zip(chunks, results) if error]
+        analysis = self.merge(chunks, [answer for answer, _ in results], incomplete=bool(failed))
+        chunking = {
+            'chunks': len(chunks),
+            'max_chars': self.max_chars,
+            'overlap': self.overlap,
+            'workers': self.max_workers,
+            'text_chars': len(text),
+            'failed': failed,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+        return analysis, chunking
+
+    def merge(self, chunks, answers, incomplete=False):
+        """
+        Reduce the per-chunk answers into one analysis in the template's schema;
+        incomplete means some chunks have no answer
+        """
+        def first(key):
+            for answer in answers:
+                if answer.get(key) not in (None, '', 0, 0.0):
+                    return answer[key]
+            return None
+
+        def union(key):
+            return unique(value for answer in answers for value in as_list(answer.get(key)))
+
+        values = [value for value in (as_number(answer.get('contract_value')) for answer in answers) if value]
+        found_sections = {section for chunk in chunks for section in chunk.sections}
+        found_sections.update(section for section in union('sections_found') if section in self.required_sections)
+        sections = {
+            section: {
+                'present': section in found_sections,
+                'chunks': [chunk.index for chunk in chunks if section in chunk.sections]
+            } for section in self.required_sections
+        }
+        missing = [section for section in self.required_sections if not sections[section]['present']]
+
+        indicators = set(union('risk_indicators'))
+        risk_assessment, risk_score = {}, 0.0
+        for category, spec in self.risk_assessment.items():
+            hits = [indicator for indicator in spec.get('indicators', []) if indicator in indicators]
+            score = len(hits) / max(1, len(spec.get('indicators', [])))
+            risk_assessment[category] = {'indicators': hits, 'score': round(score, 3), 'weight': spec.get('weight')}
+            risk_score += score * spec.get('weight', 0)
+        red_flags = [flag for flag in union('red_flags') if flag in self.red_flags]
+        # Missing required sections count as documentation risk on their own
+        risk_score = min(1.0, risk_score + 0.05 * len(missing))
+        if red_flags:
+            risk_level = 'HIGH'
+        elif incomplete:
+            risk_level = 'UNKNOWN'
+        else:
+            risk_level = next(level for level, floor in RISK_LEVELS if risk_score >= floor)
+        # An unknown risk still needs a legal review before approval
+        workflow = 'medium_risk' if risk_level == 'UNKNOWN' else f'{risk_level.lower()}_risk'
+
+        confidences = [answer.get('confidence_score') for answer in answers
+                       if isinstance(answer.get('confidence_score'), (int, float))]
+        return {
+            'contract_type': first('contract_type'),
+            'parties': union('parties'),
+            'effective_date': first('effective_date'),
+            'expiration_date': first('expiration_date'),
+            'contract_value': max(values) if values else None,
+            'sections': sections,
+            'missing_sections': missing,
+            'key_terms': union('key_terms'),
+            'risk_factors': union('risk_factors'),
+            'risk_assessment': risk_assessment,
+            'red_flags': red_flags,
+            'risk_score': round(risk_score, 3),
+            'risk_level': risk_level,
+            'requires_review': incomplete,
+            'approval_workflow': self.approval_workflow.get(workflow, []),
+            'compliance_requirements': union('compliance_requirements'),
+            'action_items': union('action_items'),
+            'confidence_score': round(sum(confidences) / len(confidences), 3) if confidences else 0.0
+        }
+
+
+def contract_analyzer_from_env(template_dir, llm):
+    """ContractAnalyzer for templates/contract-analysis.json, or None if it is missing"""
+    path = os.path.join(template_dir, 'contract-analysis.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        template = json.load(f)
+    return ContractAnalyzer(
+        template, llm,
+        max_chars=int(os.getenv('ANALYZER_CHUNK_CHARS', '4000')),
+        overlap=int(os.getenv('ANALYZER_CHUNK_OVERLAP', '300')),
+        max_workers=int(os.getenv('ANALYZER_CHUNK_WORKERS', '2'))
+    )
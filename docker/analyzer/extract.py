@@ -0,0 +1,419 @@
+"""
+Rule-based field extraction for invoices and certificates of conformity.
+
+The fields to extract and the checks to run come from the required_fields
+and validation_rules / compliance_checks of templates/<type>-analysis.json.
+Each field has a small list of compiled patterns, tried in order from the
+most specific (a labelled value such as "Invoice number: ...") to the most
+generic (an identifier or date anywhere in the text), and each pattern
+carries the confidence of a value it finds. Extracted values are then run
+through the template's checks; a value that fails one is kept but its
+confidence drops, so the LLM is asked to confirm it.
+
+Only fields that are missing or below min_confidence are left for the LLM.
+"""
+
+import glob
+import json
+import os
+import re
+from datetime import date, timedelta
+
+LOW_CONFIDENCE = 0.5
+# Values filled in by the LLM are trusted less than a labelled match
+LLM_CONFIDENCE = 0.7
+
+DATE = r'(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[./-]\d{1,2}[./-]\d{4})'
+AMOUNT = r'(\d{1,3}(?:[ ,.\u00a0]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?)(?!\d)'
+# Prices on invoice rows are written with decimals
+PRICE = r'(\d{1,3}(?:[ ,.\u00a0]\d{3})*[.,]\d{2})(?!\d)'
+CURRENCY_CODES = ('EUR', 'USD', 'PLN', 'GBP', 'CHF', 'SEK', 'NOK', 'DKK', 'CZK')
+CURRENCY_SYMBOLS = {'€': 'EUR', '$': 'USD', '£': 'GBP', 'zł': 'PLN'}
+CURRENCY = r'(' + '|'.join(CURRENCY_CODES) + r'|€|\$|£|zł)'
+# A value after a label runs to the end of the line or the first comma
+VALUE = r'([^\n,;(]*[^\s\n,;(])'
+
+
+def compile_rules(rules):
+    return [(re.compile(pattern, re.I | re.M), confidence) for pattern, confidence in rules]
+
+
+# field: [(pattern, confidence), ...], most specific first; group 1 is the value
+FIELD_PATTERNS = {
+    'invoice_number': compile_rules([
+        (r'(?:invoice\s*(?:number|no\.?|nr|#)|numer faktury|faktura(?: vat)?\s*(?:nr|no\.?))\s*[:#]?\s*'
+         r'([a-z0-9][\w/.-]*\d[\w/-]*)', 0.95),
+        (r'\b((?:inv|fv|pf)[-/ ]?\d[\w/-]*\d|(?:inv|fv|pf)[-/ ]?\d)\b', 0.85)
+    ]),
+    'invoice_date': compile_rules([
+        (r'(?:invoice date|date of issue|issue date|issued on|data wystawienia|data faktury)\s*:?\s*' + DATE,
+         0.95),
+        (r'^\s*date\s*:?\s*' + DATE, 0.85)
+    ]),
+    'due_date': compile_rules([
+        (r'(?:due date|payment due|pay by|termin płatności|płatne do)\s*:?\s*' + DATE, 0.95)
+    ]),
+    'supplier_name': compile_rules([
+        (r'(?:supplier(?: name)?|seller|vendor|sprzedawca|wystawca)\s*:\s*' + VALUE, 0.9)
+    ]),
+    'total_amount': compile_rules([
+        (r'(?:\btotal amount due|\btotal amount|\bamount due|\btotal due|\bgrand total|razem do zapłaty|'
+         r'do zapłaty|\btotal|\brazem)\s*:?\s*' + CURRENCY + r'?\s*' + AMOUNT, 0.95)
+    ]),
+    'currency': compile_rules([
+        (r'(?:currency|waluta)\s*:\s*' + CURRENCY, 0.95)
+    ]),
+    'certificate_number': compile_rules([
+        (r'(?:certificate\s*(?:number|no\.?|nr)|numer certyfikatu|certyfikat(?: zgodności)?\s*nr)\s*:?\s*'
+         r'([a-z0-9][\w/.-]*\d[\w/-]*)', 0.95),
+        (r'\b(COR-\d{4}-[A-Z]{2,3}-\d{6})\b', 0.9)
+    ]),
+    'issuing_authority': compile_rules([
+        (r'(?:issuing authority|issuing body|certification body|notified body|jednostka notyfikowana|'
+         r'jednostka certyfikująca)\s*:\s*' + VALUE, 0.95),
+        (r'(?:issued by|wydany przez)\s*:?\s*' + VALUE, 0.85)
+    ]),
+    'product_name': compile_rules([
+        (r'(?:product name|product|wyrób|produkt|nazwa wyrobu)\s*:\s*' + VALUE, 0.9)
+    ]),
+    'manufacturer': compile_rules([
+        (r'(?:manufacturer|producent|wytwórca)\s*:\s*' + VALUE, 0.95),
+        (r'^\s*(?:we|my)\s*,\s*' + VALUE, 0.85)
+    ]),
+    'test_results': compile_rules([
+        (r'(?:test results?|wyniki? badań)\s*:\s*' + VALUE, 0.95)
+    ])
+}
+
+STANDARD = re.compile(r'\b(?:PN-)?(?:EN|ISO|IEC)(?:[ /](?:ISO|IEC))?[ ]\d{3,5}(?:-\d+)*(?::\d{4})?')
+RELATIVE_DUE = re.compile(r'(?:within|payment terms|termin płatności|płatne w ciągu)\s*:?\s*(\d{1,3})\s*'
+                          r'(?:days|dni)', re.I)
+VALIDITY_RANGE = re.compile(r'(?:validity period|valid|ważny|okres ważności)\s*(?:from|od)?\s*:?\s*' + DATE +
+                            r'\s*(?:to|until|do|-|–)\s*' + DATE, re.I)
+VALID_UNTIL = re.compile(r'(?:valid until|valid to|valid thru|expiry date|expires|ważny do|data ważności)\s*:?\s*'
+                         + DATE, re.I)
+SIGNATURE = re.compile(r'\b(?:authori[sz]ed signature|signature|signed by|podpis)', re.I)
+CONFORMS = re.compile(r'\b(?:complies with|in conformity with|conforms to|spełnia wymagania|jest zgodny)', re.I)
+LINE_ITEMS_LABEL = re.compile(r'(?:line items|items|pozycje)\s*:\s*([^\n]+)', re.I)
+ITEM_ROW = re.compile(r'^\s*(?:\d{1,3}\.\s*)?([^\d\n][^\n]*?)\s+(\d+(?:[.,]\d+)?)\s+' + PRICE + r'\s+(.*)$',
+                      re.M)
+NOT_AN_ITEM = re.compile(r'^\s*(?:sub)?total|^\s*razem|^\s*tax\b|^\s*vat\b|^\s*suma|amount due|do zapłaty', re.I)
+
+
+def parse_date(value):
+    """ISO date string from YYYY-MM-DD or day-first DD.MM.YYYY, or None"""
+    parts = re.split(r'[./-]', value)
+    try:
+        if len(parts[0]) == 4:
+            return date(int(parts[0]), int(parts[1]), int(parts[2])).isoformat()
+        return date(int(parts[2]), int(parts[1]), int(parts[0])).isoformat()
+    except (ValueError, IndexError):
+        return None
+
+
+def parse_amount(value):
+    """Float from 6,150.00 / 6.150,00 / 6 150,00 / 615,00 style amounts"""
+    value = value.replace(' ', '').replace('\u00a0', '')
+    if ',' in value and '.' in value:
+        decimal = ',' if value.rfind(',') > value.rfind('.') else '.'
+        value = value.replace('.' if decimal == ',' else ',', '').replace(',', '.')
+    elif ',' in value:
+        value = value.replace(',', '.') if re.search(r',\d{1,2}$', value) else value.replace(',', '')
+    elif value.count('.') > 1 or re.search(r'\.\d{3}$', value):
+        value = value.replace('.', '')
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def normalize_currency(value):
+    return CURRENCY_SYMBOLS.get(value.lower(), CURRENCY_SYMBOLS.get(value, value.upper()))
+
+
+def normalize_standard(value):
+    """'PN-EN ISO 12100:2010' -> 'EN ISO 12100', for comparing with required standards"""
+    value = re.sub(r'^PN-', '', value.upper())
+    return re.sub(r':\d{4}$', '', value)
+
+
+def first_match(field, text):
+    for pattern, confidence in FIELD_PATTERNS.get(field, ()):
+        match = pattern.search(text)
+        if match:
+            return match, confidence
+    return None, 0.0
+
+
+def extract_text_field(field, text, found):
+    match, confidence = first_match(field, text)
+    if match:
+        return match.group(1).strip(), confidence
+    return None
+
+
+def extract_date_field(field, text, found):
+    match, confidence = first_match(field, text)
+    if match:
+        value = parse_date(match.group(1))
+        if value:
+            return value, confidence
+    return None
+
+
+def extract_due_date(field, text, found):
+    result = extract_date_field(field, text, found)
+    if result:
+        return result
+    # "Payment terms: 30 days" counted from the invoice date
+    match = RELATIVE_DUE.search(text)
+    if match and found.get('invoice_date'):
+        due = date.fromisoformat(found['invoice_date'][0]) + timedelta(days=int(match.group(1)))
+        return due.isoformat(), 0.85
+    return None
+
+
+def extract_total_amount(field, text, found):
+    match, confidence = first_match(field, text)
+    if match:
+        amount = parse_amount(match.group(2))
+        if amount is not None:
+            return amount, confidence
+    return None
+
+
+def extract_currency(field, text, found):
+    match, confidence = first_match(field, text)
+    if match:
+        return normalize_currency(match.group(1)), confidence
+    total = FIELD_PATTERNS['total_amount'][0][0].search(text)
+    if total:
+        # Currency written next to the total, before or after the amount
+        after = re.match(r'\s*' + CURRENCY, text[total.end():], re.I)
+        symbol = total.group(1) or (after.group(1) if after else None)
+        if symbol:
+            return normalize_currency(symbol), 0.95
+    codes = re.findall(r'\b(' + '|'.join(CURRENCY_CODES) + r')\b', text)
+    if codes:
+        return max(set(codes), key=codes.count), 0.8
+    return None
+
+
+def extract_line_items(field, text, found):
+    match = LINE_ITEMS_LABEL.search(text)
+    if match:
+        return [{'description': match.group(1).strip()}], 0.85
+    items = []
+    for row in ITEM_ROW.finditer(text):
+        if NOT_AN_ITEM.search(row.group(1)):
+            continue
+        # The last amount on the row is its total, whatever the columns between
+        amounts = re.findall(AMOUNT, row.group(4))
+        items.append({
+            'description': row.group(1).strip(),
+            'quantity': parse_amount(row.group(2)),
+            'unit_price': parse_amount(row.group(3)),
+            'total': parse_amount(amounts[-1]) if amounts else parse_amount(row.group(3))
+        })
+    if items:
+        return items, 0.8
+    return None
+
+
+def extract_standards(field, text, found):
+    standards = []
+    for match in STANDARD.finditer(text):
+        if match.group(0) not in standards:
+            standards.append(match.group(0))
+    if standards:
+        return standards, 0.9
+    return None
+
+
+def extract_test_results(field, text, found):
+    result = extract_text_field(field, text, found)
+    if result:
+        return result
+    if CONFORMS.search(text):
+        return 'passed', 0.8
+    return None
+
+
+def extract_validity_period(field, text, found):
+    match = VALIDITY_RANGE.search(text)
+    if match:
+        start, end = parse_date(match.group(1)), parse_date(match.group(2))
+        if start and end:
+            return {'start': start, 'end': end}, 0.95
+    match = VALID_UNTIL.search(text)
+    if match and parse_date(match.group(1)):
+        return {'start': None, 'end': parse_date(match.group(1))}, 0.85
+    return None
+
+
+def extract_signature(field, text, found):
+    if SIGNATURE.search(text):
+        return True, 0.85
+    return None
+
+
+EXTRACTORS = {
+    'invoice_number': extract_text_field,
+    'invoice_date': extract_date_field,
+    'due_date': extract_due_date,
+    'supplier_name': extract_text_field,
+    'total_amount': extract_total_amount,
+    'currency': extract_currency,
+    'line_items': extract_line_items,
+    'certificate_number': extract_text_field,
+    'issuing_authority': extract_text_field,
+    'product_name': extract_text_field,
+    'manufacturer': extract_text_field,
+    'standards_compliance': extract_standards,
+    'test_results': extract_test_results,
+    'validity_period': extract_validity_period,
+    'authorized_signature': extract_signature
+}
+
+
+def check_rule(rule, fields, today):
+    """True if the value passes, False if it fails, None if it cannot be checked"""
+    validation = rule.get('validation')
+    value = fields.get(rule.get('field'))
+    if value is None:
+        return None
+    if validation == 'numeric_range':
+        return rule.get('min_value', float('-inf')) <= value <= rule.get('max_value', float('inf'))
+    if validation == 'future_date':
+        reference = date.fromisoformat(fields.get('invoice_date') or today.isoformat())
+        return (date.fromisoformat(value) - reference).days <= rule.get('max_days_future', 0)
+    if validation == 'regex':
+        return re.fullmatch(rule['pattern'], str(value)) is not None
+    if validation == 'date_range':
+        if not value.get('start') or not value.get('end'):
+            return None
+        days = (date.fromisoformat(value['end']) - date.fromisoformat(value['start'])).days
+        return 0 <= days <= rule.get('max_validity_days', days)
+    if validation == 'required_standards':
+        present = {normalize_standard(standard) for standard in value}
+        return all(normalize_standard(standard) in present for standard in rule.get('required', []))
+    return None
+
+
+# Values the LLM returns as text for fields the checks expect parsed
+COERCE = {
+    'total_amount': parse_amount,
+    'invoice_date': lambda value: parse_date(value) or value,
+    'due_date': lambda value: parse_date(value) or value
+}
+
+# status field, issues field and (passed, unclear, failed) values per type,
+# as the alert routes in Node-RED and Camel expect them
+STATUS_FIELDS = {
+    'INVOICE': ('validation_status', 'anomalies', ('VALID', 'NEEDS_REVIEW', 'INVALID')),
+    'COR': ('compliance_status', 'issues_found', ('COMPLIANT', 'UNCLEAR', 'NON_COMPLIANT'))
+}
+
+
+class FieldExtractor:
+    def __init__(self, document_type, template, min_confidence=0.8):
+        criteria = template.get('analysis_criteria', {})
+        self.document_type = document_type
+        self.name = template.get('document_type', document_type)
+        self.fields = criteria.get('required_fields', [])
+        self.rules = criteria.get('validation_rules', []) + criteria.get('compliance_checks', [])
+        self.min_confidence = min_confidence
+
+    def extract(self, text, today=None):
+        """
+        Return {'fields', 'confidence', 'unresolved', 'issues'}; unresolved
+        lists the fields the LLM still has to provide or confirm
+        """
+        found = {}
+        for field in self.fields:
+            extractor = EXTRACTORS.get(field)
+            result = extractor(field, text, found) if extractor else None
+            if result is not None:
+                found[field] = result
+        fields = {field: found[field][0] if field in found else None for field in self.fields}
+        confidence = {field: found[field][1] if field in found else 0.0 for field in self.fields}
+        issues = self.validate(fields, confidence, today)
+        unresolved = [field for field in self.fields if confidence[field] < self.min_confidence]
+        return {'fields': fields, 'confidence': confidence, 'unresolved': unresolved, 'issues': issues}
+
+    def validate(self, fields, confidence=None, today=None):
+        """Run the template checks; a failed value's confidence drops to LOW_CONFIDENCE"""
+        issues = []
+        for rule in self.rules:
+            try:
+                passed = check_rule(rule, fields, today or date.today())
+            except (TypeError, ValueError, AttributeError):
+                # A value of the wrong shape, as the LLM sometimes returns
+                passed = False
+            if passed is False:
+                issues.append({'field': rule['field'], 'severity': rule.get('severity', 'MEDIUM'),
+                               'message': rule.get('message', 'Validation failed')})
+                # A missing standard is a finding about the document, not a doubtful extraction
+                if confidence is not None and rule.get('validation') != 'required_standards':
+                    confidence[rule['field']] = min(confidence[rule['field']], LOW_CONFIDENCE)
+        return issues
+
+    def prompt(self, text, result):
+        """LLM prompt asking only for the unresolved fields of an extract() result"""
+        known = {field: value for field, value in result['fields'].items() if field not in result['unresolved']}
+        wanted = ',\n'.join(f'  "{field}": null' for field in result['unresolved'])
+        return (
+            f'Extract these fields from the {self.name} below. These values are already known and must not be '
+            f'repeated: {json.dumps(known, ensure_ascii=False)}\n\n{text}\n\n'
+            f'Return only JSON with these keys, null where the document does not say:\n{{\n{wanted}\n}}'
+        )
+
+    def merge(self, result, answer, today=None):
+        """
+        Fill the unresolved fields of `result` from an LLM answer and re-run the
+        checks; 'answered' lists the fields the LLM supplied a value for
+        """
+        fields, confidence = dict(result['fields']), dict(result['confidence'])
+        answered = []
+        for field in result['unresolved']:
+            value = answer.get(field)
+            if isinstance(value, str) and field in COERCE:
+                value = COERCE[field](value)
+            if value not in (None, '', []):
+                fields[field], confidence[field] = value, LLM_CONFIDENCE
+                answered.append(field)
+        issues = self.validate(fields, confidence, today)
+        unresolved = [field for field in self.fields if fields[field] is None]
+        return {'fields': fields, 'confidence': confidence, 'unresolved': unresolved, 'issues': issues,
+                'answered': answered}
+
+    def summary(self, result):
+        """
+        The analysis in the shape the LLM prompts used to return: the fields
+        plus a status, the list of issues and an overall confidence_score
+        """
+        analysis = dict(result['fields'])
+        status_field, issues_field, (good, unclear, bad) = STATUS_FIELDS.get(
+            self.document_type, ('status', 'issues', ('OK', 'NEEDS_REVIEW', 'FAILED')))
+        severities = {issue['severity'] for issue in result['issues']}
+        if 'HIGH' in severities:
+            analysis[status_field] = bad
+        elif severities or result['unresolved']:
+            analysis[status_field] = unclear
+        else:
+            analysis[status_field] = good
+        analysis[issues_field] = [issue['message'] for issue in result['issues']]
+        analysis['confidence_score'] = round(sum(result['confidence'].values()) / max(1, len(self.fields)), 3)
+        return analysis
+
+
+def load_extractors(template_dir, min_confidence=0.8):
+    """{document_type: FieldExtractor} for every template with required_fields"""
+    extractors = {}
+    for path in sorted(glob.glob(os.path.join(template_dir, '*-analysis.json'))):
+        document_type = os.path.basename(path)[:-len('-analysis.json')].upper()
+        with open(path, 'r', encoding='utf-8') as f:
+            template = json.load(f)
+        if template.get('analysis_criteria', {}).get('required_fields'):
+            extractors[document_type] = FieldExtractor(document_type, template, min_confidence)
+    return extractors
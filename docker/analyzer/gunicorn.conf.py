@@ -0,0 +1,14 @@
+"""
+Production server settings for the analyzer (gunicorn -c gunicorn.conf.py app:app).
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('ANALYZER_PORT', '8091')}"
+workers = int(os.getenv('ANALYZER_WEB_WORKERS', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('ANALYZER_WEB_THREADS', '8'))
+timeout = int(os.getenv('ANALYZER_WEB_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
@@ -0,0 +1,49 @@
+"""
+Minimal Ollama client for the fields the rule-based extraction leaves open.
+"""
+
+import json
+import os
+import re
+
+import requests
+
+JSON_OBJECT = re.compile(r'\{.*\}', re.S)
+
+
+def parse_json_response(text):
+    """The JSON object in an LLM response, or {} if there is none"""
+    match = JSON_OBJECT.search(text or '')
+    if not match:
+        return {}
+    try:
+        value = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+class OllamaClient:
+    def __init__(self, base_url, model, timeout=300):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def generate(self, prompt):
+        """Return the parsed JSON answer to `prompt`"""
+        response = self.session.post(
+            f'{self.base_url}/api/generate',
+            json={'model': self.model, 'prompt': prompt, 'stream': False, 'format': 'json'},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return parse_json_response(response.json().get('response'))
+
+
+def llm_from_env():
+    return OllamaClient(
+        base_url=os.getenv('OLLAMA_URL', 'http://ollama:11434'),
+        model=os.getenv('LLM_MODEL', 'llama2:13b'),
+        timeout=float(os.getenv('OLLAMA_TIMEOUT', '300'))
+    )
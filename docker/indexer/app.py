@@ -0,0 +1,72 @@
+from flask import Flask, request, jsonify
+import atexit
+import json
+import os
+
+from bulk import Backpressure, indexer_from_env
+
+app = Flask(__name__)
+
+DOCUMENTS_INDEX = os.getenv('INDEXER_DOCUMENTS_INDEX', 'documents')
+ALERTS_INDEX = os.getenv('INDEXER_ALERTS_INDEX', 'compliance-alerts')
+# Longest a ?wait=true request blocks for its documents to be indexed
+WAIT_TIMEOUT = float(os.getenv('INDEXER_WAIT_TIMEOUT', '30'))
+
+indexer = indexer_from_env()
+atexit.register(indexer.close)
+
+
+def request_documents():
+    """Documents from a JSON object, a JSON array or an NDJSON body"""
+    body = request.get_data(cache=False).decode('utf-8')
+    if request.mimetype == 'application/x-ndjson':
+        docs = [json.loads(line) for line in body.splitlines() if line.strip()]
+    else:
+        payload = json.loads(body)
+        docs = payload if isinstance(payload, list) else [payload]
+    if not docs or not all(isinstance(doc, dict) for doc in docs):
+        raise ValueError('Expected a JSON object, an array of objects or NDJSON')
+    return docs
+
+
+def queue_documents(index):
+    try:
+        docs = request_documents()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        tickets = indexer.submit(index, docs)
+    except Backpressure as e:
+        response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+
+    if request.args.get('wait', 'false').lower() not in ('1', 'true', 'yes'):
+        return jsonify({'index': index, 'queued': len(tickets), 'ids': [t.doc_id for t in tickets]}), 202
+
+    for ticket in tickets:
+        ticket.wait(WAIT_TIMEOUT)
+    items = [{'_id': t.doc_id, 'status': 'indexed' if t.result else 'failed' if t.error else 'pending',
+              'error': t.error} for t in tickets]
+    errors = any(item['status'] != 'indexed' for item in items)
+    return jsonify({'index': index, 'errors': errors, 'items': items}), 207 if errors else 200
+
+
+@app.route('/documents', methods=['POST'])
+def index_documents():
+    """Queue docForStorage documents for the documents index"""
+    return queue_documents(DOCUMENTS_INDEX)
+
+@app.route('/alerts', methods=['POST'])
+def index_alerts():
+    """Queue alerts for the compliance-alerts index"""
+    return queue_documents(ALERTS_INDEX)
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'healthy'})
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify(indexer.stats())
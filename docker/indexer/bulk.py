@@ -0,0 +1,274 @@
+"""
+Buffered Elasticsearch bulk indexing.
+
+Documents are queued in memory and sent with one _bulk request whenever the
+buffer reaches max_docs documents or max_bytes of NDJSON, or when the oldest
+queued document has waited flush_interval seconds. Every document gets its
+_id when it is queued, so resending a request after a timeout cannot create
+duplicates.
+
+Items Elasticsearch rejects with 429 or 5xx (or whole requests that fail
+that way) go back to the front of the queue and the flusher backs off
+exponentially. While it does, the queue fills up and submit() raises
+Backpressure once max_pending documents are waiting. Other per-item errors,
+such as mapping conflicts, fail that document only. A response that is not
+a valid _bulk answer (a proxy error page, say) is retried like a 5xx, and
+any other error while sending fails that batch without stopping the
+flusher.
+"""
+
+import collections
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+class Backpressure(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """Completion handle for one queued document"""
+
+    def __init__(self, index, doc_id):
+        self.index = index
+        self.doc_id = doc_id
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def _finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self._done.set()
+
+
+class _Entry:
+    __slots__ = ('lines', 'ticket', 'attempts', 'queued_at')
+
+    def __init__(self, lines, ticket):
+        self.lines = lines
+        self.ticket = ticket
+        self.attempts = 0
+        self.queued_at = time.monotonic()
+
+
+class BulkIndexer:
+    def __init__(self, es_url, max_docs=500, max_bytes=5 * 1024 * 1024, flush_interval=1.0,
+                 max_pending=20000, max_retries=5, max_backoff=30.0, timeout=60):
+        self.es_url = es_url.rstrip('/')
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._pending = collections.deque()
+        self._pending_bytes = 0
+        self._cond = threading.Condition()
+        self._closing = False
+        self._backoff = 0.0
+        self._indexed_at = collections.deque()
+        self._bulk_seconds = collections.deque(maxlen=200)
+        self._counts = {'queued': 0, 'indexed': 0, 'failed': 0, 'retried': 0, 'rejected': 0, 'bulk_requests': 0}
+        self._thread = threading.Thread(target=self._run, name='bulk-flusher', daemon=True)
+        self._thread.start()
+
+    def submit(self, index, docs):
+        """Queue documents for `index`; returns one Ticket per document or raises Backpressure"""
+        entries = []
+        for doc in docs:
+            ticket = Ticket(index, uuid.uuid4().hex)
+            action = json.dumps({'index': {'_index': index, '_id': ticket.doc_id}})
+            entries.append(_Entry(f'{action}\n{json.dumps(doc)}\n'.encode('utf-8'), ticket))
+        with self._cond:
+            if self._closing:
+                raise Backpressure('Indexer is shutting down', 5)
+            if len(self._pending) + len(entries) > self.max_pending:
+                self._counts['rejected'] += len(entries)
+                raise Backpressure('Indexing queue is full, retry later', self.retry_after())
+            for entry in entries:
+                self._pending.append(entry)
+                self._pending_bytes += len(entry.lines)
+            self._counts['queued'] += len(entries)
+            if len(self._pending) >= self.max_docs or self._pending_bytes >= self.max_bytes:
+                self._cond.notify()
+        return [entry.ticket for entry in entries]
+
+    def retry_after(self):
+        return max(1, math.ceil(self._backoff or self.flush_interval))
+
+    def _ready(self):
+        if not self._pending:
+            return False
+        return (self._closing or len(self._pending) >= self.max_docs or self._pending_bytes >= self.max_bytes
+                or time.monotonic() - self._pending[0].queued_at >= self.flush_interval)
+
+    def _take_batch(self):
+        batch, size = [], 0
+        while self._pending and len(batch) < self.max_docs:
+            entry = self._pending[0]
+            if batch and size + len(entry.lines) > self.max_bytes:
+                break
+            self._pending.popleft()
+            self._pending_bytes -= len(entry.lines)
+            batch.append(entry)
+            size += len(entry.lines)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ready():
+                    if self._closing:
+                        return
+                    timeout = self.flush_interval
+                    if self._pending:
+                        timeout = max(0.0, self._pending[0].queued_at + self.flush_interval - time.monotonic())
+                    self._cond.wait(timeout)
+                batch = self._take_batch()
+            try:
+                self._send(batch)
+            except Exception as e:
+                # The flusher is the only consumer; if it died the queue would fill for good
+                logger.exception('Bulk request failed')
+                self._fail([entry for entry in batch if not entry.ticket.done], f'Bulk request failed: {e}')
+            if self._backoff and not self._closing:
+                time.sleep(self._backoff)
+
+    def _send(self, batch):
+        start = time.monotonic()
+        try:
+            response = self.session.post(f'{self.es_url}/_bulk', data=b''.join(entry.lines for entry in batch),
+                                         headers={'Content-Type': 'application/x-ndjson'}, timeout=self.timeout)
+        except requests.RequestException as e:
+            self._retry(batch, str(e))
+            return
+        finally:
+            with self._cond:
+                self._counts['bulk_requests'] += 1
+                self._bulk_seconds.append(time.monotonic() - start)
+
+        if response.status_code == 429 or response.status_code >= 500:
+            self._retry(batch, f'HTTP {response.status_code}')
+            return
+        if response.status_code >= 400:
+            self._fail(batch, f'HTTP {response.status_code}: {response.text[:500]}')
+            return
+
+        try:
+            items = response.json()['items']
+        except (ValueError, KeyError, TypeError):
+            items = None
+        if not isinstance(items, list) or len(items) != len(batch):
+            self._retry(batch, f'Malformed _bulk response: {response.text[:200]}')
+            return
+
+        retry, indexed = [], 0
+        try:
+            for entry, item in zip(batch, items):
+                outcome = next(iter(item.values()))
+                status = outcome.get('status', 500)
+                if status < 300:
+                    entry.ticket._finish(result={'_index': outcome.get('_index'), '_id': outcome.get('_id'),
+                                                 'result': outcome.get('result')})
+                    indexed += 1
+                elif status == 429 or status >= 500:
+                    retry.append(entry)
+                else:
+                    self._fail([entry], outcome.get('error'))
+        finally:
+            # Count what was indexed even if a malformed item stops the loop
+            self._record_indexed(indexed)
+        if retry:
+            self._retry(retry, 'rejected by Elasticsearch')
+        else:
+            self._backoff = 0.0
+
+    def _retry(self, entries, reason):
+        """Requeue retryable entries at the front, in order, and back off"""
+        retry = []
+        for entry in entries:
+            entry.attempts += 1
+            if entry.attempts > self.max_retries:
+                self._fail([entry], f'Gave up after {self.max_retries} retries: {reason}')
+            else:
+                retry.append(entry)
+        with self._cond:
+            for entry in reversed(retry):
+                self._pending.appendleft(entry)
+                self._pending_bytes += len(entry.lines)
+            self._counts['retried'] += len(retry)
+        self._backoff = min(self.max_backoff, self._backoff * 2 or 0.5)
+
+    def _record_indexed(self, count):
+        now = time.monotonic()
+        with self._cond:
+            self._counts['indexed'] += count
+            self._indexed_at.append((now, count))
+            self._prune_rate(now)
+
+    def _prune_rate(self, now):
+        # Only the last minute feeds docs_per_second
+        while self._indexed_at and now - self._indexed_at[0][0] > 60:
+            self._indexed_at.popleft()
+
+    def _fail(self, entries, error):
+        for entry in entries:
+            entry.ticket._finish(error=error)
+        with self._cond:
+            self._counts['failed'] += len(entries)
+
+    def close(self, timeout=30):
+        """Flush what is queued and stop the flusher"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._cond:
+            self._prune_rate(now)
+            window = sum(count for _, count in self._indexed_at)
+            seconds = sorted(self._bulk_seconds)
+            return {
+                **self._counts,
+                'pending': len(self._pending),
+                'pending_bytes': self._pending_bytes,
+                'max_pending': self.max_pending,
+                'docs_per_second': round(window / 60, 2),
+                'bulk_p50_seconds': round(seconds[len(seconds) // 2], 3) if seconds else None,
+                'backoff_seconds': self._backoff,
+                'limits': {'max_docs': self.max_docs, 'max_bytes': self.max_bytes,
+                           'flush_interval': self.flush_interval}
+            }
+
+
+def indexer_from_env():
+    return BulkIndexer(
+        es_url=os.getenv('ELASTICSEARCH_URL', 'http://elasticsearch:9200'),
+        max_docs=int(os.getenv('INDEXER_BULK_DOCS', '500')),
+        max_bytes=int(os.getenv('INDEXER_BULK_MB', '5')) * 1024 * 1024,
+        flush_interval=float(os.getenv('INDEXER_FLUSH_INTERVAL', '1')),
+        max_pending=int(os.getenv('INDEXER_MAX_PENDING', '20000')),
+        max_retries=int(os.getenv('INDEXER_MAX_RETRIES', '5'))
+    )
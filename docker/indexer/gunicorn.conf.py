@@ -0,0 +1,18 @@
+"""
+Production server settings for the indexer (gunicorn -c gunicorn.conf.py app:app).
+
+Documents are buffered in the worker's memory and flushed by one background
+thread, so run a single worker process; threads only parse and queue.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('INDEXER_PORT', '8090')}"
+workers = 1
+worker_class = 'gthread'
+threads = int(os.getenv('INDEXER_WEB_THREADS', '16'))
+# ?wait=true requests block until their bulk request completes
+timeout = int(os.getenv('INDEXER_WEB_TIMEOUT', '120'))
+graceful_timeout = 60
+keepalive = 5
+accesslog = '-'
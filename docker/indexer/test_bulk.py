@@ -0,0 +1,98 @@
+"""
+BulkIndexer against a fake Elasticsearch that answers _bulk with garbage.
+
+Run with: cd docker/indexer && python3 -m unittest test_bulk
+"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bulk import BulkIndexer
+
+
+class FakeElasticsearch(BaseHTTPRequestHandler):
+    # Body returned for the next _bulk requests; None answers like Elasticsearch does
+    reply = None
+
+    def do_POST(self):
+        lines = self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8').splitlines()
+        if self.reply is not None:
+            body, content_type = self.reply, 'text/html'
+        else:
+            items = [{'index': {**json.loads(action)['index'], 'status': 201, 'result': 'created'}}
+                     for action in lines[::2]]
+            body, content_type = json.dumps({'errors': False, 'items': items}), 'application/json'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body.encode('utf-8'))))
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+class GarbageResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeElasticsearch)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.indexer = BulkIndexer(f'http://127.0.0.1:{self.server.server_port}', flush_interval=0.01,
+                                   max_retries=1, max_backoff=0.05, timeout=5)
+
+    def tearDown(self):
+        FakeElasticsearch.reply = None
+        self.indexer.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def assert_finished(self, tickets):
+        for ticket in tickets:
+            self.assertTrue(ticket.wait(5), 'ticket never finished')
+
+    def test_non_json_body_fails_the_batch_and_keeps_flushing(self):
+        FakeElasticsearch.reply = '<html><body>502 Bad Gateway</body></html>'
+        tickets = self.indexer.submit('documents', [{'n': 1}, {'n': 2}])
+        self.assert_finished(tickets)
+        self.assertTrue(all(t.error and 'Malformed' in t.error for t in tickets))
+
+        FakeElasticsearch.reply = None
+        tickets = self.indexer.submit('documents', [{'n': 3}])
+        self.assert_finished(tickets)
+        self.assertEqual(tickets[0].result['result'], 'created')
+        self.assertTrue(self.indexer._thread.is_alive())
+
+    def test_malformed_items_do_not_stop_the_flusher(self):
+        FakeElasticsearch.reply = json.dumps({'items': ['not an item']})
+        tickets = self.indexer.submit('documents', [{'n': 1}])
+        self.assert_finished(tickets)
+        self.assertIsNotNone(tickets[0].error)
+
+        FakeElasticsearch.reply = None
+        tickets = self.indexer.submit('documents', [{'n': 2}])
+        self.assert_finished(tickets)
+        self.assertIsNone(tickets[0].error)
+        self.assertEqual(self.indexer.stats()['failed'], 1)
+
+    def test_items_indexed_before_a_malformed_one_are_counted(self):
+        FakeElasticsearch.reply = json.dumps({'items': [
+            {'index': {'_index': 'documents', '_id': 'a', 'status': 201, 'result': 'created'}}, 'not an item']})
+        tickets = self.indexer.submit('documents', [{'n': 1}, {'n': 2}])
+        self.assert_finished(tickets)
+        self.assertIsNone(tickets[0].error)
+        self.assertIsNotNone(tickets[1].error)
+        stats = self.indexer.stats()
+        self.assertEqual((stats['indexed'], stats['failed']), (1, 1))
+
+    def test_rate_window_is_pruned_on_every_flush(self):
+        self.indexer._indexed_at.append((time.monotonic() - 120, 5))
+        tickets = self.indexer.submit('documents', [{'n': 1}])
+        self.assert_finished(tickets)
+        with self.indexer._cond:
+            self.assertEqual([count for _, count in self.indexer._indexed_at], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
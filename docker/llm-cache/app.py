@@ -0,0 +1,132 @@
+from flask import Flask, Response, request, jsonify
+import logging
+import os
+import threading
+
+import requests
+
+from cache import SingleFlight, cache_from_env, request_key
+
+app = Flask(__name__)
+logger = logging.getLogger(__name__)
+
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://ollama:11434').rstrip('/')
+UPSTREAM_TIMEOUT = float(os.getenv('LLM_CACHE_UPSTREAM_TIMEOUT', '300'))
+# Response headers that must not be copied from the upstream response
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-encoding', 'content-length'}
+
+llm_cache = cache_from_env()
+single_flight = SingleFlight()
+session = requests.Session()
+
+# Requests answered without a new inference and the inference time they saved
+counters = {'requests': 0, 'deduplicated': 0, 'passthrough': 0, 'upstream_errors': 0, 'cache_write_errors': 0,
+            'saved_seconds': 0.0}
+counters_lock = threading.Lock()
+
+
+class UpstreamError(Exception):
+    def __init__(self, status, body, content_type):
+        super().__init__(f'Ollama returned {status}')
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+
+
+def count(name, value=1):
+    with counters_lock:
+        counters[name] += value
+
+
+def saved_seconds(response):
+    """Inference time Ollama reported for a response (total_duration is in ns)"""
+    return (response.get('total_duration') or 0) / 1e9
+
+
+def generate_upstream(payload, key):
+    response = session.post(f'{OLLAMA_URL}/api/generate', json=payload, timeout=UPSTREAM_TIMEOUT)
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.content, response.headers.get('Content-Type'))
+    result = response.json()
+    if llm_cache is not None and result.get('done', True):
+        try:
+            llm_cache.put(key, result)
+        except OSError as e:
+            count('cache_write_errors')
+            # A full or read-only cache disk must not fail an inference that succeeded
+            logger.warning(f'Could not cache response {key[:12]}: {e}')
+    return result
+
+
+def proxy(path, stream=False):
+    """Forward the request to Ollama unchanged"""
+    upstream = session.request(
+        request.method, f'{OLLAMA_URL}/{path}', params=request.args, data=request.get_data(),
+        headers={'Content-Type': request.content_type} if request.content_type else None,
+        timeout=UPSTREAM_TIMEOUT, stream=stream
+    )
+    headers = [(name, value) for name, value in upstream.headers.items() if name.lower() not in HOP_HEADERS]
+    body = upstream.iter_content(chunk_size=None) if stream else upstream.content
+    return Response(body, status=upstream.status_code, headers=headers)
+
+
+@app.route('/api/generate', methods=['POST'])
+def generate():
+    """Ollama /api/generate with cached and deduplicated non-streaming responses"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not payload.get('model'):
+        return jsonify({'error': 'Expected a JSON body with a model'}), 400
+    count('requests')
+    # Streaming responses are forwarded as they are; Ollama streams unless told not to
+    if payload.get('stream', True):
+        count('passthrough')
+        try:
+            return proxy('api/generate', stream=True)
+        except requests.RequestException as e:
+            return jsonify({'error': f'Ollama unavailable: {e}'}), 502
+
+    key = request_key(payload)
+    refresh = 'no-cache' in request.headers.get('Cache-Control', '')
+    cached = llm_cache.get(key) if llm_cache is not None and not refresh else None
+    if cached is not None:
+        count('saved_seconds', saved_seconds(cached))
+        response = jsonify(cached)
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
+    try:
+        result, shared = single_flight.do(key, lambda: generate_upstream(payload, key))
+    except UpstreamError as e:
+        count('upstream_errors')
+        return Response(e.body, status=e.status, content_type=e.content_type)
+    except requests.RequestException as e:
+        count('upstream_errors')
+        return jsonify({'error': f'Ollama unavailable: {e}'}), 502
+    if shared:
+        count('deduplicated')
+        count('saved_seconds', saved_seconds(result))
+    response = jsonify(result)
+    response.headers['X-Cache'] = 'DEDUP' if shared else 'MISS'
+    return response
+
+@app.route('/api/<path:path>', methods=['GET', 'POST', 'DELETE'])
+def passthrough(path):
+    """Every other Ollama endpoint, uncached, so clients can use this as their Ollama URL"""
+    count('passthrough')
+    try:
+        return proxy(f'api/{path}')
+    except requests.RequestException as e:
+        return jsonify({'error': f'Ollama unavailable: {e}'}), 502
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'healthy'})
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    with counters_lock:
+        snapshot = dict(counters)
+    snapshot['saved_seconds'] = round(snapshot['saved_seconds'], 1)
+    snapshot['in_flight'] = single_flight.in_flight()
+    snapshot['cache'] = llm_cache.stats() if llm_cache is not None else {'enabled': False}
+    return jsonify(snapshot)
@@ -0,0 +1,197 @@
+"""
+Disk cache and in-flight deduplication for Ollama /api/generate responses.
+
+Responses are keyed by the SHA-256 of the request fields that determine the
+answer: the model, the prompt (the prompt template filled with the document
+text), system prompt, template, format and options. Transport fields such
+as stream and keep_alive are not part of the key. Entries expire after ttl
+seconds and the directory is kept under disk_bytes by evicting the least
+recently used entries.
+
+Identical requests that arrive while the first one is still running wait
+for it and share its response instead of starting their own inference.
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ('model', 'prompt', 'suffix', 'system', 'template', 'format', 'options', 'raw', 'images', 'context')
+
+
+def request_key(payload):
+    """Cache key for a /api/generate request body"""
+    canonical = json.dumps({field: payload.get(field) for field in KEY_FIELDS},
+                           sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, disk_dir, disk_bytes=1024 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self._disk = collections.OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+        self._load_disk_index()
+
+    def get(self, key):
+        """Return the cached response for a key, or None if missing or expired"""
+        with self._lock:
+            on_disk = key in self._disk
+        entry = self._read_disk(key) if on_disk else None
+        with self._lock:
+            if entry is not None and time.time() - entry['created'] > self.ttl:
+                self._counters['expired'] += 1
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['hits'] += 1
+            self._touch_disk(key)
+        return entry['response']
+
+    def put(self, key, response):
+        data = json.dumps({'created': time.time(), 'response': response}, ensure_ascii=False).encode('utf-8')
+        if len(data) > self.disk_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._counters['stores'] += 1
+            self._disk_size += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            while self._disk_size > self.disk_bytes:
+                old_key = next(iter(self._disk))
+                self._counters['evictions'] += 1
+                self._remove(old_key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'hit_ratio': round(self._counters['hits'] / lookups, 3) if lookups else None,
+                'entries': len(self._disk),
+                'disk_bytes': self._disk_size,
+                'disk_limit_bytes': self.disk_bytes,
+                'ttl_seconds': self.ttl
+            }
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + '.json')
+
+    def _load_disk_index(self):
+        os.makedirs(self.disk_dir, exist_ok=True)
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        logger.info(f'LLM cache: {len(self._disk)} entries ({self._disk_size} bytes) on disk')
+
+    def _read_disk(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self._remove(key)
+            return None
+
+    def _touch_disk(self, key):
+        # The mtime orders entries by last use when the index is rebuilt at startup
+        self._disk.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _remove(self, key):
+        """Drop an entry; called with the lock held"""
+        self._disk_size -= self._disk.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers share its outcome"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Return (result, shared); shared is True if another caller ran fn"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+def cache_from_env():
+    """Create the response cache from LLM_CACHE_* settings, or None if disabled"""
+    if os.getenv('LLM_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    return LLMCache(
+        disk_dir=os.getenv('LLM_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'llm-cache')),
+        disk_bytes=int(os.getenv('LLM_CACHE_DISK_MB', '1024')) * 1024 * 1024,
+        ttl=float(os.getenv('LLM_CACHE_TTL_HOURS', '168')) * 3600
+    )
@@ -0,0 +1,18 @@
+"""
+Production server settings for the LLM cache (gunicorn -c gunicorn.conf.py app:app).
+
+Identical in-flight requests are deduplicated inside one process, so run a
+single worker; threads mostly wait on Ollama.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('LLM_CACHE_PORT', '8092')}"
+workers = 1
+worker_class = 'gthread'
+threads = int(os.getenv('LLM_CACHE_WEB_THREADS', '32'))
+# Requests block for a whole inference
+timeout = int(os.getenv('LLM_CACHE_WEB_TIMEOUT', '600'))
+graceful_timeout = 60
+keepalive = 5
+accesslog = '-'
@@ -1,33 +1,501 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context, url_for
+import metrics
+import functools
+import json
 import subprocess
 import tempfile
+import time
 import os
 
+from batch import TAR_TYPES, ZIP_TYPES, BatchItem, iter_archive_file, iter_tar, run_batch
+from cache import cache_from_env, cache_key
+from jobs import JobQueue, QueueFull, backend_from_env
+from limits import Overloaded, slots_from_env
+from pages import PAGE_SEPARATOR, RangeError, available_cpus, ocr_pages, page_count, smart_pages
+from uploads import SpoolingRequest, discard_unclaimed, spooled_upload
+from warm import pool_from_env
+
 app = Flask(__name__)
+app.request_class = SpoolingRequest
+
+TEXT_CHUNK_SIZE = 64 * 1024
+
+# force: OCR every page; smart: use the existing text layer, OCR only pages without one
+OCR_MODES = ('force', 'smart')
+
+
+class OCRError(Exception):
+    def __init__(self, message, returncode=None):
+        super().__init__(message)
+        self.returncode = returncode
+
+
+def ocr_options(values):
+    """OCR options taken from the request; they are part of the cache key"""
+    mode = values.get('mode') or os.getenv('OCR_MODE', 'force')
+    if mode not in OCR_MODES:
+        raise ValueError(f"Unknown OCR mode {mode!r}, expected one of: {', '.join(OCR_MODES)}")
+    return {
+        'mode': mode,
+        'language': values.get('language') or os.getenv('OCR_LANGUAGE') or None
+    }
+
+
+def ocr_command(options=None):
+    """ocrmypdf command line for the given options, without file arguments"""
+    options = options or {}
+    command = ['ocrmypdf', '--force-ocr']
+    if options.get('language'):
+        command += ['-l', options['language']]
+    return command
+
+
+def run_ocr(input_path, options=None, deadline=None):
+    """Run ocrmypdf on a PDF on disk and return the sidecar text"""
+    if warm_pool is not None:
+        return run_ocr_warm(input_path, options or {}, deadline)
+    output_path = input_path + '.ocr.pdf'
+    command = ocr_command(options) + ['--sidecar', output_path + '.txt', input_path, output_path]
+    try:
+        with ocr_slots.slot(deadline), metrics.OCRMYPDF_SECONDS.labels('document').time():
+            result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            metrics.record_failure(result.returncode)
+            raise OCRError(result.stderr, result.returncode)
+        metrics.PAGES_PROCESSED.labels('ocr').inc(page_count(input_path))
+        with metrics.SIDECAR_READ_SECONDS.labels('document').time(), open(output_path + '.txt', 'r') as f:
+            return f.read()
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        if os.path.exists(output_path + '.txt'):
+            os.remove(output_path + '.txt')
+
+
+def run_ocr_warm(input_path, options, deadline=None):
+    """run_ocr on a long-lived worker instead of a fresh ocrmypdf process"""
+    sidecar_path = input_path + '.txt'
+    try:
+        with ocr_slots.slot(deadline):
+            exit_code, error, seconds, cold = warm_pool.run(input_path, sidecar_path, options.get('language'))
+        metrics.OCRMYPDF_SECONDS.labels('pool_cold' if cold else 'pool_warm').observe(seconds)
+        if exit_code != 0:
+            metrics.record_failure(exit_code)
+            raise OCRError(error, exit_code)
+        metrics.PAGES_PROCESSED.labels('ocr').inc(page_count(input_path))
+        with metrics.SIDECAR_READ_SECONDS.labels('document').time(), open(sidecar_path, 'r') as f:
+            return f.read()
+    finally:
+        if os.path.exists(sidecar_path):
+            os.remove(sidecar_path)
+
+
+def run_ocr_text_only(input_path, sidecar_path, options=None, deadline=None):
+    """Run ocrmypdf writing only the sidecar file, no output PDF
+
+    Returns the peak RSS of ocrmypdf and its children in KB.
+    """
+    command = ocr_command(options) + ['--output-type', 'none', '--sidecar', sidecar_path, input_path, '-']
+    with ocr_slots.slot(deadline), metrics.OCRMYPDF_SECONDS.labels('text_only').time():
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        stderr = process.stderr.read()
+        process.stderr.close()
+        # wait4 instead of wait() so the child's resource usage is not lost
+        _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        metrics.record_failure(process.returncode)
+        raise OCRError(stderr, process.returncode)
+    metrics.PAGES_PROCESSED.labels('ocr').inc(page_count(input_path))
+    return usage.ru_maxrss
+
+
+def stream_text_json(read_chunks, extra):
+    """Yield a JSON object {"text": ..., **extra} with the text streamed in chunks"""
+    yield '{"text": "'
+    for chunk in read_chunks:
+        yield json.dumps(chunk)[1:-1]
+    yield '", ' + json.dumps(extra)[1:]
+
+
+def read_text_chunks(path, remove=False):
+    # Only time spent in read() counts, not time waiting on the client
+    read_seconds = 0.0
+    try:
+        with open(path, 'r') as f:
+            while True:
+                start = time.monotonic()
+                chunk = f.read(TEXT_CHUNK_SIZE)
+                read_seconds += time.monotonic() - start
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        metrics.SIDECAR_READ_SECONDS.labels('stream').observe(read_seconds)
+        if remove and os.path.exists(path):
+            os.remove(path)
+
+
+def page_results(input_path, options, deadline=None):
+    """Yield (page_number, text, source) for every page in completion order"""
+    slot = functools.partial(ocr_slots.slot, deadline)
+    if options.get('mode') == 'smart':
+        results = smart_pages(input_path, ocr_command(options), workers=OCR_PAGE_WORKERS,
+                              pages_per_range=OCR_PAGES_PER_RANGE, min_chars=OCR_TEXT_LAYER_MIN_CHARS,
+                              slot=slot)
+    else:
+        results = ((number, text, 'ocr') for number, text in
+                   ocr_pages(input_path, ocr_command(options), workers=OCR_PAGE_WORKERS,
+                             pages_per_range=OCR_PAGES_PER_RANGE, slot=slot))
+    for number, text, source in results:
+        metrics.PAGES_PROCESSED.labels(source).inc()
+        yield number, text, source
+
+
+def run_smart_ocr(input_path, options, deadline=None):
+    """Pages of a PDF taken from its text layer where present, OCR elsewhere
+
+    Returns (page texts, page sources), both in page order.
+    """
+    results = {}
+    for number, text, source in page_results(input_path, options, deadline):
+        results[number] = (text, source)
+    ordered = [results[number] for number in sorted(results)]
+    return [text for text, _ in ordered], [source for _, source in ordered]
+
+
+def page_summary(page_sources):
+    """How many pages took each path"""
+    sources = {'text_layer': 0, 'ocr': 0}
+    for source in page_sources:
+        sources[source] += 1
+    return {'total': len(page_sources), **sources}
+
+
+def encode_entry(text, page_sources=None):
+    """Cache entry for a result; smart mode results keep the source of every page"""
+    if page_sources is None:
+        return text
+    return json.dumps({'text': text, 'sources': page_sources})
+
+
+def decode_entry(entry, options):
+    """(text, page sources or None) of a cache entry, or None if it cannot be used"""
+    if options.get('mode') != 'smart':
+        return entry, None
+    try:
+        value = json.loads(entry)
+        return value['text'], value['sources']
+    except (ValueError, KeyError, TypeError):
+        # Written before the page breakdown was cached
+        return None
+
+
+def cached_result(key, options):
+    entry = ocr_cache.get(key) if key else None
+    return decode_entry(entry, options) if entry is not None else None
+
+
+def ocr_document(input_path, digest, options, deadline=None):
+    """OCR a saved upload, consulting the result cache
+
+    Returns a dict with the text, whether it came from the cache and, in
+    smart mode, how many pages took each path. Cache hits return the same
+    breakdown as the run that stored them.
+    """
+    key = cache_key(digest, options) if ocr_cache is not None else None
+    cached = cached_result(key, options)
+    if cached is not None:
+        text, page_sources = cached
+    else:
+        if options.get('mode') == 'smart':
+            pages, page_sources = run_smart_ocr(input_path, options, deadline)
+            text = PAGE_SEPARATOR.join(pages)
+        else:
+            text, page_sources = run_ocr(input_path, options, deadline), None
+        if key:
+            ocr_cache.put(key, encode_entry(text, page_sources))
+    result = {'text': text}
+    if page_sources is not None:
+        result['pages'] = page_summary(page_sources)
+    result['cached'] = cached is not None
+    return result
+
+
+def stream_pages(input_path, digest, options):
+    """Yield NDJSON lines, one per page as it finishes, then an ordered summary"""
+    key = cache_key(digest, options) if ocr_cache is not None else None
+    cached = cached_result(key, options)
+    try:
+        if cached is not None:
+            text, page_sources = cached
+            pages = text.split(PAGE_SEPARATOR)
+            for number, page in enumerate(pages):
+                yield json.dumps({'page': number + 1, 'text': page, 'source': 'cache'}) + '\n'
+        else:
+            results = {}
+            for number, page, source in page_results(input_path, options):
+                results[number] = (page, source)
+                yield json.dumps({'page': number + 1, 'text': page, 'source': source}) + '\n'
+            ordered = [results[number] for number in sorted(results)]
+            pages = [page for page, _ in ordered]
+            page_sources = [source for _, source in ordered]
+            text = PAGE_SEPARATOR.join(pages)
+            if key:
+                smart = options.get('mode') == 'smart'
+                ocr_cache.put(key, encode_entry(text, page_sources if smart else None))
+        # Force mode OCRs every page, so its sources are the same with or without the cache
+        sources = {}
+        for source in page_sources or ['ocr'] * len(pages):
+            sources[source] = sources.get(source, 0) + 1
+        yield json.dumps({
+            'done': True,
+            'pages': len(pages),
+            'sources': sources,
+            'cached': cached is not None,
+            'text': text
+        }) + '\n'
+    except RangeError as e:
+        yield json.dumps({'done': True, 'error': str(e)}) + '\n'
+
+
+def batch_items():
+    """Files of a /ocr/batch request: multipart parts, archive parts or a raw archive body"""
+    spool_dir = app.config['OCR_SPOOL_DIR']
+    if request.mimetype in TAR_TYPES:
+        yield from iter_tar(request.stream, spool_dir)
+        return
+    if request.mimetype in ZIP_TYPES:
+        path, _ = spooled_upload(request.spool_body())
+        yield from iter_archive_file(path, spool_dir)
+        return
+    for file in request.files.getlist('file') + request.files.getlist('files'):
+        path, digest = spooled_upload(file)
+        yield BatchItem(file.filename, path, digest)
+    for file in request.files.getlist('archive'):
+        path, _ = spooled_upload(file)
+        yield from iter_archive_file(path, spool_dir)
+
+
+def stream_batch(options):
+    """Yield one NDJSON line per file as it completes, then a summary line"""
+    started = time.monotonic()
+    counts = {'files': 0, 'failed': 0, 'cached': 0}
+
+    def process(item):
+        return ocr_document(item.path, item.digest, options)
+
+    try:
+        for index, item, result, error, seconds in run_batch(batch_items(), process, OCR_BATCH_WORKERS):
+            counts['files'] += 1
+            line = {'index': index, 'file': item.name, 'seconds': round(seconds, 3)}
+            if error:
+                counts['failed'] += 1
+                line['error'] = error
+            else:
+                counts['cached'] += result['cached']
+                line.update(result)
+            yield json.dumps(line) + '\n'
+    except Exception as e:
+        counts['error'] = f'Could not read batch: {e}'
+    finally:
+        # Parts are parsed inside this generator, after the request teardown has run
+        discard_unclaimed(request)
+    yield json.dumps({'done': True, **counts, 'seconds': round(time.monotonic() - started, 3)}) + '\n'
+
+
+def run_job(input_path, digest, options):
+    return ocr_document(input_path, digest, options)['text']
+
+
+ocr_cache = cache_from_env()
+
+OCR_SPOOL_DIR = os.getenv('OCR_JOB_DIR', os.path.join(tempfile.gettempdir(), 'ocr-jobs'))
+app.config['OCR_SPOOL_DIR'] = OCR_SPOOL_DIR
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('OCR_MAX_UPLOAD_MB', '512')) * 1024 * 1024 or None
+
+OCR_PAGE_WORKERS = int(os.getenv('OCR_PAGE_WORKERS', '0')) or available_cpus()
+OCR_PAGES_PER_RANGE = int(os.getenv('OCR_PAGES_PER_RANGE', '1'))
+OCR_TEXT_LAYER_MIN_CHARS = int(os.getenv('OCR_TEXT_LAYER_MIN_CHARS', '20'))
+OCR_BATCH_WORKERS = int(os.getenv('OCR_BATCH_WORKERS', '2'))
+
+# Machine-wide cap on concurrent ocrmypdf processes, shared by all server workers
+ocr_slots = slots_from_env(available_cpus())
+
+# Long-lived ocrmypdf workers for /ocr, jobs and batches; None runs the CLI per request
+warm_pool = pool_from_env()
+
+job_queue = JobQueue(
+    run_job,
+    backend_from_env(),
+    workers=int(os.getenv('OCR_JOB_WORKERS', '2')),
+    spool_dir=OCR_SPOOL_DIR
+)
+
+
+def released_on_close(response, admission, path=None):
+    """Release a streaming response's admission, and remove its claimed upload, when the server closes it
+
+    The WSGI server closes the response whether the body was sent in full,
+    the client went away or the body was never iterated.
+    """
+    response.call_on_close(admission.release)
+    if path is not None:
+        response.call_on_close(lambda: os.path.exists(path) and os.remove(path))
+    return response
+
+
+# Endpoints whose upload and response sizes are recorded in /metrics
+OCR_ENDPOINTS = ('ocr_pdf', 'ocr_pdf_stream', 'ocr_pdf_pages', 'ocr_batch', 'submit_ocr_job')
+
+metrics.track_in_flight('requests', lambda: ocr_slots.stats()['inflight_requests'])
+metrics.track_in_flight('ocrmypdf', lambda: ocr_slots.stats()['active_in_process'])
+metrics.track_in_flight('jobs_running', lambda: job_queue.stats()['running'])
+metrics.track_in_flight('jobs_queued', lambda: job_queue.backend.depth())
+
+
+@app.after_request
+def record_response_metrics(response):
+    if request.endpoint not in OCR_ENDPOINTS:
+        return response
+    if request.receive_seconds:
+        metrics.UPLOAD_RECEIVE_SECONDS.labels(request.endpoint).observe(request.receive_seconds)
+    sizes = metrics.RESPONSE_BYTES.labels(request.endpoint)
+    if response.is_streamed:
+        response.response = metrics.counted(response.response, sizes)
+    else:
+        sizes.observe(response.content_length or 0)
+    return response
+
+
+@app.teardown_request
+def remove_spooled_uploads(exc):
+    discard_unclaimed(request)
+
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    return jsonify({'error': str(e)}), e.status_code, {'Retry-After': str(e.retry_after)}
+
 
 @app.route('/ocr', methods=['POST'])
 def ocr_pdf():
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
     file = request.files['file']
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as input_file:
-        file.save(input_file.name)
-        output_path = input_file.name + '.ocr.pdf'
+    try:
+        options = ocr_options(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    input_path, digest = spooled_upload(file)
+    with ocr_slots.admit(wait=ocr_slots.wait) as admission:
         try:
-            result = subprocess.run([
-                'ocrmypdf', '--force-ocr', '--sidecar', output_path + '.txt', input_file.name, output_path
-            ], capture_output=True, text=True)
-            if result.returncode != 0:
-                return jsonify({'error': result.stderr}), 500
-            with open(output_path + '.txt', 'r') as f:
-                text = f.read()
-            return jsonify({'text': text})
-        finally:
-            os.remove(input_file.name)
-            if os.path.exists(output_path):
-                os.remove(output_path)
-            if os.path.exists(output_path + '.txt'):
-                os.remove(output_path + '.txt')
+            return jsonify(ocr_document(input_path, digest, options, admission.deadline))
+        except (OCRError, RangeError) as e:
+            return jsonify({'error': str(e)}), 500
+
+@app.route('/ocr/stream', methods=['POST'])
+def ocr_pdf_stream():
+    """Text-only OCR for very large files: one copy on disk, text streamed back
+
+    Accepts a multipart upload or a raw application/pdf body. No output PDF
+    is written and the sidecar is streamed into the response in chunks.
+    """
+    try:
+        options = ocr_options(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if options['mode'] != 'force':
+        return jsonify({'error': '/ocr/stream only supports mode=force'}), 400
+    if request.mimetype == 'application/pdf':
+        input_path, digest = spooled_upload(request.spool_body())
+    elif 'file' in request.files:
+        input_path, digest = spooled_upload(request.files['file'])
+    else:
+        return jsonify({'error': 'No file uploaded'}), 400
+    input_bytes = os.path.getsize(input_path)
+    usage = {'input_bytes': input_bytes}
+
+    key = cache_key(digest, options) if ocr_cache is not None else None
+    text = ocr_cache.get(key) if key else None
+    if text is not None:
+        chunks = (text[i:i + TEXT_CHUNK_SIZE] for i in range(0, len(text), TEXT_CHUNK_SIZE))
+        usage['peak_disk_bytes'] = input_bytes
+        return Response(stream_text_json(chunks, {'cached': True, 'usage': usage}),
+                        mimetype='application/json')
+
+    sidecar_path = input_path + '.txt'
+    try:
+        with ocr_slots.admit(wait=ocr_slots.wait) as admission:
+            usage['ocr_peak_rss_kb'] = run_ocr_text_only(input_path, sidecar_path, options, admission.deadline)
+    except OCRError as e:
+        if os.path.exists(sidecar_path):
+            os.remove(sidecar_path)
+        return jsonify({'error': str(e)}), 500
+    usage['sidecar_bytes'] = os.path.getsize(sidecar_path)
+    usage['peak_disk_bytes'] = input_bytes + usage['sidecar_bytes']
+    if key:
+        ocr_cache.put_file(key, sidecar_path)
+    return Response(stream_text_json(read_text_chunks(sidecar_path, remove=True),
+                                     {'cached': False, 'usage': usage}),
+                    mimetype='application/json')
+
+@app.route('/ocr/pages', methods=['POST'])
+def ocr_pdf_pages():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    file = request.files['file']
+    try:
+        options = ocr_options(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Claimed: the request teardown runs before the body is streamed
+    input_path, digest = spooled_upload(file, claim=True)
+    try:
+        admission = ocr_slots.admit()
+    except Overloaded:
+        os.remove(input_path)
+        raise
+    return released_on_close(Response(stream_with_context(stream_pages(input_path, digest, options)),
+                                      mimetype='application/x-ndjson'), admission, input_path)
+
+@app.route('/ocr/batch', methods=['POST'])
+def ocr_batch():
+    try:
+        options = ocr_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    admission = ocr_slots.admit()
+    return released_on_close(Response(stream_with_context(stream_batch(options)),
+                                      mimetype='application/x-ndjson'), admission)
+
+@app.route('/ocr/jobs', methods=['POST'])
+def submit_ocr_job():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    file = request.files['file']
+    try:
+        options = ocr_options(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    input_path, digest = spooled_upload(file, claim=True)
+    try:
+        job = job_queue.submit(input_path, filename=file.filename, digest=digest, options=options)
+    except QueueFull:
+        return jsonify({'error': 'OCR job queue is full, retry later'}), 503, {
+            'Retry-After': str(ocr_slots.retry_after)
+        }
+    status_url = url_for('get_ocr_job', job_id=job['id'])
+    return jsonify({'job_id': job['id'], 'status': job['status'], 'status_url': status_url}), 202, {
+        'Location': status_url
+    }
+
+@app.route('/ocr/jobs/<job_id>', methods=['GET'])
+def get_ocr_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
 
 @app.route('/', methods=['GET'])
 def index():
@@ -56,5 +524,19 @@ def index():
 def health():
     return 'OK', 200
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify({
+        'jobs': job_queue.stats(),
+        'cache': ocr_cache.stats() if ocr_cache else {'enabled': False},
+        'limits': ocr_slots.stats(),
+        'warm_pool': warm_pool.stats() if warm_pool else {'enabled': False}
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8080)
@@ -0,0 +1,119 @@
+"""
+Batch OCR.
+
+Files come from a multipart list or from a zip/tar archive. Tar archives are
+read as a stream, so members are spooled and handed to the worker pool while
+the rest of the upload is still arriving. The number of files waiting on
+disk is bounded, and results are yielded as each file completes.
+"""
+
+import concurrent.futures
+import os
+import tarfile
+import time
+import zipfile
+
+from uploads import CHUNK_SIZE, HashingSpoolFile
+
+ZIP_TYPES = ('application/zip', 'application/x-zip-compressed')
+TAR_TYPES = ('application/x-tar', 'application/gzip', 'application/x-gzip', 'application/x-gtar')
+
+
+class BatchItem:
+    def __init__(self, name, path=None, digest=None, owned=False, error=None):
+        self.name = name
+        self.path = path
+        self.digest = digest
+        # Owned items were extracted from an archive and are removed once processed
+        self.owned = owned
+        self.error = error
+
+
+def is_pdf_name(name):
+    return name.lower().endswith('.pdf')
+
+
+def _spool_member(name, fileobj, spool_dir):
+    spooled = HashingSpoolFile(spool_dir)
+    try:
+        while True:
+            chunk = fileobj.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            spooled.write(chunk)
+    finally:
+        spooled.close()
+    return BatchItem(name, spooled.name, spooled.hexdigest(), owned=True)
+
+
+def iter_zip(path, spool_dir):
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            if not is_pdf_name(info.filename):
+                yield BatchItem(info.filename, error='Not a PDF, skipped')
+                continue
+            with archive.open(info) as member:
+                yield _spool_member(info.filename, member, spool_dir)
+
+
+def iter_tar(fileobj, spool_dir):
+    # 'r|*' reads sequentially, so the archive never has to be on disk as a whole
+    with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+            if not is_pdf_name(info.name):
+                yield BatchItem(info.name, error='Not a PDF, skipped')
+                continue
+            yield _spool_member(info.name, archive.extractfile(info), spool_dir)
+
+
+def iter_archive_file(path, spool_dir):
+    """Yield items from an archive already on disk, zip or any tar flavour"""
+    if zipfile.is_zipfile(path):
+        yield from iter_zip(path, spool_dir)
+    else:
+        with open(path, 'rb') as f:
+            yield from iter_tar(f, spool_dir)
+
+
+def run_batch(items, process, workers, max_pending=None):
+    """Run process(item) for every item on a thread pool
+
+    Yields (index, item, result, error, seconds) in completion order. At most
+    max_pending items are queued or running at once, which also bounds how
+    far ahead of the workers an archive is unpacked.
+    """
+    max_pending = max_pending or workers * 2
+    pending = {}
+
+    def timed(item):
+        start = time.monotonic()
+        try:
+            return process(item), None, time.monotonic() - start
+        except Exception as e:
+            return None, str(e), time.monotonic() - start
+        finally:
+            if item.owned and item.path and os.path.exists(item.path):
+                os.remove(item.path)
+
+    def finished(futures):
+        for future in futures:
+            index, item = pending.pop(future)
+            result, error, seconds = future.result()
+            yield index, item, result, error, seconds
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for index, item in enumerate(items):
+            if item.error:
+                yield index, item, None, item.error, 0.0
+                continue
+            while len(pending) >= max_pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                yield from finished(done)
+            pending[pool.submit(timed, item)] = (index, item)
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            yield from finished(done)
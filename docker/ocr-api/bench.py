@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+OCR API benchmark.
+
+Drives the OCR endpoints with the PDFs in sample-docs/ plus synthetic
+multi-page scans, at a configurable concurrency, and reports latency
+percentiles, pages/sec, CPU seconds per page and peak memory as JSON that
+can be diffed between releases. Empty or unreadable sample PDFs are
+skipped with a warning and listed in the report.
+
+By default the Flask app is imported and driven in-process through its test
+client, so nothing else has to be running and CPU/memory figures include
+every ocrmypdf child. With --url the same scenarios run against a live
+server instead (CPU and memory are then not measured).
+
+Usage: python3 bench.py [--scenarios sync,smart,pages,stream,batch,jobs]
+                        [--concurrency 4] [--iterations 2] [--synthetic-pages 5,20]
+                        [--output bench.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_DOCS = os.path.join(HERE, '..', '..', 'sample-docs')
+
+SCENARIOS = {
+    'sync': ('/ocr', {}),
+    'smart': ('/ocr', {'mode': 'smart'}),
+    'pages': ('/ocr/pages', {}),
+    'stream': ('/ocr/stream', {}),
+    'batch': ('/ocr/batch', {}),
+    'jobs': ('/ocr/jobs', {})
+}
+
+
+def make_synthetic_pdf(path, pages):
+    """Write a scanned-looking PDF: one rendered text image per page, no text layer"""
+    from PIL import Image, ImageDraw
+
+    images = []
+    for number in range(pages):
+        image = Image.new('L', (1240, 1754), 255)
+        draw = ImageDraw.Draw(image)
+        for line in range(40):
+            draw.text((80, 80 + line * 40),
+                      f'Page {number + 1} line {line + 1}: INVOICE INV-2024-{number:03d}{line:02d} '
+                      f'total {line * 37.5:.2f} EUR due 2024-12-{(line % 28) + 1:02d}', fill=0)
+        images.append(image)
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=150)
+
+
+def count_pages(path):
+    import pikepdf
+
+    with pikepdf.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def load_corpus(synthetic_pages, work_dir):
+    """Return (documents, skipped); empty or unreadable sample PDFs are skipped"""
+    corpus, skipped = [], []
+    for path in sorted(glob.glob(os.path.join(SAMPLE_DOCS, '*.pdf'))):
+        name = os.path.basename(path)
+        if os.path.getsize(path) == 0:
+            skipped.append(f'{name}: empty file')
+            continue
+        try:
+            pages = count_pages(path)
+        except Exception as e:
+            skipped.append(f'{name}: {e}')
+            continue
+        corpus.append({'name': name, 'path': path, 'pages': pages, 'bytes': os.path.getsize(path)})
+    for pages in synthetic_pages:
+        path = os.path.join(work_dir, f'synthetic-{pages}p.pdf')
+        make_synthetic_pdf(path, pages)
+        corpus.append({'name': os.path.basename(path), 'path': path, 'pages': count_pages(path),
+                       'bytes': os.path.getsize(path)})
+    for reason in skipped:
+        print(f'⚠️  Skipping {reason}', file=sys.stderr)
+    return corpus, skipped
+
+
+class LocalClient:
+    """Calls the Flask app in-process through its test client"""
+
+    def __init__(self):
+        from app import app
+
+        self.app = app
+
+    def post(self, endpoint, files, params):
+        client = self.app.test_client()
+        handles = [open(doc['path'], 'rb') for doc in files]
+        try:
+            field = 'files' if len(files) > 1 else 'file'
+            data = {field: [(handle, doc['name']) for handle, doc in zip(handles, files)]}
+            start = time.monotonic()
+            response = client.post(endpoint, query_string=params, data=data, buffered=False)
+            first_byte = None
+            body = b''
+            for chunk in response.response:
+                if first_byte is None:
+                    first_byte = time.monotonic() - start
+                body += chunk if isinstance(chunk, bytes) else chunk.encode()
+            response.close()
+            return response.status_code, body, first_byte
+        finally:
+            for handle in handles:
+                handle.close()
+
+    def get(self, path):
+        response = self.app.test_client().get(path)
+        return response.status_code, response.data
+
+
+class HttpClient:
+    """Calls a running OCR API over HTTP"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def post(self, endpoint, files, params):
+        boundary = uuid.uuid4().hex
+        field = 'files' if len(files) > 1 else 'file'
+        body = b''
+        for doc in files:
+            with open(doc['path'], 'rb') as f:
+                body += (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; '
+                         f'filename="{doc["name"]}"\r\nContent-Type: application/pdf\r\n\r\n').encode()
+                body += f.read() + b'\r\n'
+        body += f'--{boundary}--\r\n'.encode()
+        query = '?' + '&'.join(f'{k}={v}' for k, v in params.items()) if params else ''
+        request = urllib.request.Request(self.url + endpoint + query, data=body, headers={
+            'Content-Type': f'multipart/form-data; boundary={boundary}'
+        })
+        start = time.monotonic()
+        try:
+            with urllib.request.urlopen(request, timeout=3600) as response:
+                first = response.read(1)
+                first_byte = time.monotonic() - start
+                return response.status, first + response.read(), first_byte
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), None
+
+    def get(self, path):
+        try:
+            with urllib.request.urlopen(self.url + path, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def run_request(client, scenario, files):
+    """Run one scenario request and return (ok, seconds, first_byte_seconds)"""
+    endpoint, params = SCENARIOS[scenario]
+    start = time.monotonic()
+    status, body, first_byte = client.post(endpoint, files, params)
+    if scenario != 'jobs':
+        ok = status == 200 and b'"error"' not in body
+        return ok, time.monotonic() - start, first_byte
+    if status != 202:
+        return False, time.monotonic() - start, None
+    status_url = json.loads(body)['status_url']
+    while True:
+        status, body = client.get(status_url)
+        job = json.loads(body)
+        if job.get('status') in ('done', 'failed'):
+            return job['status'] == 'done', time.monotonic() - start, None
+        time.sleep(0.1)
+
+
+def cpu_seconds():
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (usage_self.ru_utime + usage_self.ru_stime +
+            usage_children.ru_utime + usage_children.ru_stime)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 4)
+
+
+def run_scenario(client, scenario, corpus, concurrency, iterations, local):
+    if scenario == 'batch':
+        requests = [corpus] * iterations
+    else:
+        requests = [[doc] for doc in corpus] * iterations
+    latencies, first_bytes, failures = [], [], 0
+    lock = threading.Lock()
+
+    def one(files):
+        nonlocal failures
+        ok, seconds, first_byte = run_request(client, scenario, files)
+        with lock:
+            if ok:
+                latencies.append(seconds)
+                if first_byte is not None:
+                    first_bytes.append(first_byte)
+            else:
+                failures += 1
+
+    cpu_before = cpu_seconds()
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, requests))
+    elapsed = time.monotonic() - start
+    cpu = cpu_seconds() - cpu_before
+    pages = sum(doc['pages'] for files in requests for doc in files)
+
+    latencies.sort()
+    first_bytes.sort()
+    result = {
+        'requests': len(requests),
+        'failures': failures,
+        'pages': pages,
+        'elapsed_seconds': round(elapsed, 3),
+        'pages_per_second': round(pages / elapsed, 3) if elapsed else None,
+        'latency_seconds': {'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+                            'p99': percentile(latencies, 99), 'max': percentile(latencies, 100)},
+        'first_byte_seconds': {'p50': percentile(first_bytes, 50), 'p95': percentile(first_bytes, 95)}
+    }
+    if local:
+        result['cpu_seconds_per_page'] = round(cpu / pages, 4) if pages else None
+    return result
+
+
+def peak_memory():
+    return {
+        'api_peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'ocr_child_peak_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the DocPro OCR API')
+    parser.add_argument('--url', help='Benchmark a running server instead of the in-process app')
+    parser.add_argument('--scenarios', default='sync,smart,pages,stream,batch,jobs',
+                        help=f"Comma separated, any of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients')
+    parser.add_argument('--iterations', type=int, default=2, help='Passes over the corpus per scenario')
+    parser.add_argument('--synthetic-pages', default='5,20', help='Page counts of generated scans, empty for none')
+    parser.add_argument('--with-cache', action='store_true', help='Keep the OCR result cache enabled')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    if not args.url and not args.with_cache:
+        # Otherwise every pass after the first measures cache hits
+        os.environ['OCR_CACHE_ENABLED'] = 'false'
+
+    with tempfile.TemporaryDirectory(prefix='ocr-bench-') as work_dir:
+        synthetic = [int(p) for p in args.synthetic_pages.split(',') if p.strip()]
+        corpus, skipped = load_corpus(synthetic, work_dir)
+        if not corpus:
+            parser.error('no readable documents to benchmark; the sample PDFs are empty or invalid, '
+                         'set --synthetic-pages to generate scans')
+
+        client = HttpClient(args.url) if args.url else LocalClient()
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'target': args.url or 'in-process',
+            'host': {'python': platform.python_version(), 'cpus': os.cpu_count(), 'platform': platform.platform()},
+            'config': {'concurrency': args.concurrency, 'iterations': args.iterations,
+                       'cache': bool(args.url) or args.with_cache},
+            'corpus': [{key: doc[key] for key in ('name', 'pages', 'bytes')} for doc in corpus],
+            'skipped': skipped,
+            'scenarios': {}
+        }
+        for scenario in scenarios:
+            print(f'⏱️  {scenario}...', file=sys.stderr)
+            report['scenarios'][scenario] = run_scenario(client, scenario, corpus, args.concurrency,
+                                                         args.iterations, local=not args.url)
+        if not args.url:
+            report['memory'] = peak_memory()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'✅ Report written to {args.output}', file=sys.stderr)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Content-addressed OCR result cache.
+
+Results are keyed by the SHA-256 of the uploaded PDF plus the OCR options, so
+a re-dropped duplicate returns the stored sidecar text without running
+ocrmypdf again. Two tiers: a size-bounded in-memory LRU in front of a
+size-bounded directory of text files evicted by last access time.
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(digest, options=None):
+    """Combine the upload digest with a canonical form of the OCR options"""
+    canonical = json.dumps(options or {}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f'{digest}:{canonical}'.encode('utf-8')).hexdigest()
+
+
+class OCRCache:
+    def __init__(self, memory_bytes=64 * 1024 * 1024, disk_dir=None, disk_bytes=1024 * 1024 * 1024):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self._memory = collections.OrderedDict()
+        self._memory_size = 0
+        self._disk = collections.OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits_memory': 0, 'hits_disk': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        if disk_dir:
+            self._load_disk_index()
+
+    def get(self, key):
+        """Return the cached text for a key or None"""
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self._counters['hits_memory'] += 1
+                return text
+            on_disk = key in self._disk
+        if on_disk:
+            text = self._read_disk(key)
+            if text is not None:
+                with self._lock:
+                    self._counters['hits_disk'] += 1
+                    self._touch_disk(key)
+                    self._remember(key, text)
+                return text
+        with self._lock:
+            self._counters['misses'] += 1
+        return None
+
+    def put(self, key, text):
+        with self._lock:
+            self._counters['stores'] += 1
+            self._remember(key, text)
+        if self.disk_dir:
+            self._write_disk(key, text)
+
+    def put_file(self, key, path):
+        """Store a UTF-8 text file in the disk tier without reading it into memory"""
+        with self._lock:
+            self._counters['stores'] += 1
+        if self.disk_dir:
+            self._write_disk(key, source_path=path)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits_memory'] + self._counters['hits_disk'] + self._counters['misses']
+            hits = lookups - self._counters['misses']
+            return {
+                **self._counters,
+                'hit_ratio': round(hits / lookups, 3) if lookups else None,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'memory_limit_bytes': self.memory_bytes,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_size,
+                'disk_limit_bytes': self.disk_bytes if self.disk_dir else 0
+            }
+
+    def _remember(self, key, text):
+        size = len(text.encode('utf-8'))
+        if size > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key).encode('utf-8'))
+        self._memory[key] = text
+        self._memory_size += size
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted.encode('utf-8'))
+            self._counters['evictions'] += 1
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + '.txt')
+
+    def _load_disk_index(self):
+        os.makedirs(self.disk_dir, exist_ok=True)
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith('.txt'):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_atime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        logger.info(f'OCR cache: {len(self._disk)} entries ({self._disk_size} bytes) on disk')
+
+    def _read_disk(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            with self._lock:
+                self._disk_size -= self._disk.pop(key, 0)
+            return None
+
+    def _touch_disk(self, key):
+        self._disk.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _write_disk(self, key, text=None, source_path=None):
+        data = text.encode('utf-8') if source_path is None else None
+        size = os.path.getsize(source_path) if data is None else len(data)
+        if size > self.disk_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            if data is None:
+                with open(source_path, 'rb') as source:
+                    shutil.copyfileobj(source, f)
+            else:
+                f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._disk_size += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            evicted = []
+            while self._disk_size > self.disk_bytes:
+                old_key, old_size = self._disk.popitem(last=False)
+                self._disk_size -= old_size
+                self._counters['evictions'] += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+
+def cache_from_env():
+    """Create the OCR cache from OCR_CACHE_* settings, or None if disabled"""
+    if os.getenv('OCR_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    return OCRCache(
+        memory_bytes=int(os.getenv('OCR_CACHE_MEMORY_MB', '64')) * 1024 * 1024,
+        disk_dir=os.getenv('OCR_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'ocr-cache')) or None,
+        disk_bytes=int(os.getenv('OCR_CACHE_DISK_MB', '1024')) * 1024 * 1024
+    )
@@ -0,0 +1,22 @@
+"""
+Production server settings for the OCR API (gunicorn -c gunicorn.conf.py app:app).
+
+OCR work happens in ocrmypdf subprocesses, so one process with a pool of
+threads is usually enough. Run more than one worker process only with
+OCR_JOB_BACKEND=redis, otherwise job status lookups can land on a worker
+that never saw the job.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('OCR_API_PORT', '8080')}"
+workers = int(os.getenv('OCR_WEB_WORKERS', '1'))
+worker_class = 'gthread'
+threads = int(os.getenv('OCR_WEB_THREADS', '16'))
+# Large scans legitimately take minutes
+timeout = int(os.getenv('OCR_WEB_TIMEOUT', '900'))
+graceful_timeout = 30
+keepalive = 5
+# Connections waiting for a free thread; beyond this the kernel refuses them
+backlog = int(os.getenv('OCR_WEB_BACKLOG', '64'))
+accesslog = '-'
@@ -0,0 +1,283 @@
+"""
+Background OCR job queue.
+
+Uploads are spooled to disk, their job ids pushed onto a queue and a bounded
+pool of worker threads drains it. The queue itself lives in a pluggable
+backend: an in-process one (default) or Redis, so several API processes can
+share one queue as long as they also share the spool directory.
+"""
+
+import collections
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the queue already holds the configured maximum of jobs"""
+
+
+class MemoryJobBackend:
+    """In-process queue and job table"""
+
+    def __init__(self, max_depth=0, ttl=3600):
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max_depth)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def push(self, job_id):
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            raise QueueFull()
+
+    def pop(self, timeout=1.0):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def save(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+            self._purge_expired()
+
+    def load(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def delete(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.get('finished_at') and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class RedisJobBackend:
+    """Redis list as the queue, one JSON string per job with a TTL"""
+
+    def __init__(self, url, max_depth=0, ttl=3600, prefix='ocr:jobs'):
+        import redis
+
+        self.ttl = ttl
+        self.max_depth = max_depth
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    @property
+    def _queue_key(self):
+        return f'{self.prefix}:queue'
+
+    def _job_key(self, job_id):
+        return f'{self.prefix}:job:{job_id}'
+
+    def push(self, job_id):
+        if self.max_depth and self._redis.llen(self._queue_key) >= self.max_depth:
+            raise QueueFull()
+        self._redis.lpush(self._queue_key, job_id)
+
+    def pop(self, timeout=1.0):
+        item = self._redis.brpop(self._queue_key, timeout=max(1, int(timeout)))
+        return item[1] if item else None
+
+    def depth(self):
+        return self._redis.llen(self._queue_key)
+
+    def save(self, job):
+        self._redis.set(self._job_key(job['id']), json.dumps(job), ex=self.ttl)
+
+    def load(self, job_id):
+        raw = self._redis.get(self._job_key(job_id))
+        return json.loads(raw) if raw else None
+
+    def delete(self, job_id):
+        self._redis.delete(self._job_key(job_id))
+
+
+def redis_url_from_env():
+    """Build a Redis URL from OCR_REDIS_URL or the REDIS_* settings in .env"""
+    url = os.getenv('OCR_REDIS_URL')
+    if url:
+        return url
+    host = os.getenv('REDIS_HOST', 'redis')
+    port = os.getenv('REDIS_PORT', '6379')
+    db = os.getenv('REDIS_DB', '0')
+    password = os.getenv('REDIS_PASSWORD')
+    auth = f':{password}@' if password else ''
+    return f'redis://{auth}{host}:{port}/{db}'
+
+
+def backend_from_env():
+    """Create the job backend selected by OCR_JOB_BACKEND (memory or redis)"""
+    kind = os.getenv('OCR_JOB_BACKEND', 'memory').lower()
+    max_depth = int(os.getenv('OCR_JOB_MAX_QUEUE', '0'))
+    ttl = int(os.getenv('OCR_JOB_TTL', '3600'))
+    if kind == 'redis':
+        return RedisJobBackend(redis_url_from_env(), max_depth=max_depth, ttl=ttl)
+    if kind != 'memory':
+        logger.warning(f'Unknown OCR_JOB_BACKEND {kind!r}, using in-memory queue')
+    return MemoryJobBackend(max_depth=max_depth, ttl=ttl)
+
+
+class JobQueue:
+    """Spools uploads, queues them and runs them on a bounded worker pool"""
+
+    PUBLIC_FIELDS = ('id', 'status', 'filename', 'created_at', 'started_at', 'finished_at',
+                     'wait_seconds', 'run_seconds', 'result', 'error')
+
+    def __init__(self, runner, backend, workers=2, spool_dir=None):
+        self.runner = runner
+        self.backend = backend
+        self.workers = workers
+        self.spool_dir = spool_dir or tempfile.gettempdir()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._wait_times = collections.deque(maxlen=1000)
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+        self._running = 0
+
+    def start(self):
+        """Start the worker threads once, in the process that serves requests"""
+        with self._start_lock:
+            if self._threads:
+                return
+            os.makedirs(self.spool_dir, exist_ok=True)
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'ocr-job-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, input_path, filename=None, **params):
+        """Queue an already spooled file and return the public job record
+
+        Extra keyword arguments must be JSON serialisable; they are stored
+        with the job and passed on to the runner.
+        """
+        self.start()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'filename': filename,
+            'input_path': input_path,
+            'params': params,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'wait_seconds': None,
+            'run_seconds': None,
+            'result': None,
+            'error': None
+        }
+        # Saved before it is pushed, so a worker never pops an id without a record
+        self.backend.save(job)
+        try:
+            self.backend.push(job['id'])
+        except QueueFull:
+            self.backend.delete(job['id'])
+            self._count('rejected')
+            self._discard(input_path)
+            raise
+        self._count('submitted')
+        return self.public(job)
+
+    def get(self, job_id):
+        job = self.backend.load(job_id)
+        return self.public(job) if job else None
+
+    def public(self, job):
+        return {key: job.get(key) for key in self.PUBLIC_FIELDS}
+
+    def stats(self):
+        with self._stats_lock:
+            waits = sorted(self._wait_times)
+            counters = dict(self._counters)
+            running = self._running
+        return {
+            'backend': type(self.backend).__name__,
+            'workers': self.workers,
+            'queue_depth': self.backend.depth(),
+            'running': running,
+            **counters,
+            'wait_seconds': {
+                'samples': len(waits),
+                'avg': round(sum(waits) / len(waits), 3) if waits else None,
+                'p50': _percentile(waits, 50),
+                'p95': _percentile(waits, 95),
+                'max': round(waits[-1], 3) if waits else None
+            }
+        }
+
+    def _work(self):
+        while True:
+            try:
+                job_id = self.backend.pop(timeout=1.0)
+            except Exception as e:
+                logger.error(f'Job backend unavailable: {e}')
+                time.sleep(1.0)
+                continue
+            if job_id is None:
+                continue
+            job = self.backend.load(job_id)
+            if job is None:
+                logger.warning(f'Job {job_id} expired before it was picked up')
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        job['status'] = 'running'
+        job['started_at'] = time.time()
+        job['wait_seconds'] = round(job['started_at'] - job['created_at'], 3)
+        self.backend.save(job)
+        with self._stats_lock:
+            self._wait_times.append(job['wait_seconds'])
+            self._running += 1
+        try:
+            job['result'] = self.runner(job['input_path'], **job.get('params', {}))
+            job['status'] = 'done'
+            self._count('completed')
+        except Exception as e:
+            logger.error(f"OCR job {job['id']} failed: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            self._count('failed')
+        finally:
+            with self._stats_lock:
+                self._running -= 1
+            self._discard(job['input_path'])
+            job['finished_at'] = time.time()
+            job['run_seconds'] = round(job['finished_at'] - job['started_at'], 3)
+            self.backend.save(job)
+
+    def _count(self, counter):
+        with self._stats_lock:
+            self._counters[counter] += 1
+
+    @staticmethod
+    def _discard(path):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
@@ -0,0 +1,142 @@
+"""
+Concurrency limits for ocrmypdf.
+
+OCRSlots caps how many ocrmypdf processes run at once across every API
+process in the container. Slots are lock files taken with flock, so the
+limit holds for several gunicorn workers as well as for threads. On top of
+that each process admits only a bounded number of OCR requests; beyond it
+requests are refused with 429, and a request that cannot get a slot within
+its wait budget gets 503. Both carry Retry-After.
+"""
+
+import contextlib
+import fcntl
+import os
+import tempfile
+import threading
+import time
+
+
+class Overloaded(Exception):
+    status_code = 503
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Saturated(Overloaded):
+    """Too many OCR requests already admitted in this process"""
+    status_code = 429
+
+
+class SlotTimeout(Overloaded):
+    """No OCR slot became free within the request's wait budget"""
+
+
+class Admission:
+    def __init__(self, slots, deadline=None):
+        self._slots = slots
+        self._released = False
+        # Monotonic time after which slot waits for this request give up
+        self.deadline = deadline
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._slots._leave()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class OCRSlots:
+    def __init__(self, limit, lock_dir=None, max_inflight=0, wait=30.0, retry_after=10):
+        self.limit = max(1, limit)
+        self.lock_dir = lock_dir or os.path.join(tempfile.gettempdir(), 'ocr-slots')
+        self.max_inflight = max_inflight
+        self.wait = wait
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._active = 0
+        self._rejected = {'saturated': 0, 'timeout': 0}
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+    def admit(self, wait=None):
+        """Admit one OCR request or raise Saturated
+
+        With a wait budget the returned Admission carries a deadline to pass
+        to slot(). Use it as a context manager for synchronous handlers;
+        streaming handlers keep it and call release() when the stream ends.
+        """
+        with self._lock:
+            if self.max_inflight and self._inflight >= self.max_inflight:
+                self._rejected['saturated'] += 1
+                raise Saturated('OCR service is saturated, retry later', self.retry_after)
+            self._inflight += 1
+        return Admission(self, time.monotonic() + wait if wait is not None else None)
+
+    def _leave(self):
+        with self._lock:
+            self._inflight -= 1
+
+    @contextlib.contextmanager
+    def slot(self, deadline=None):
+        """Hold one of the machine-wide ocrmypdf slots
+
+        Blocks until a slot is free, or until the monotonic deadline, in
+        which case SlotTimeout is raised. The deadline is passed explicitly
+        so that pool threads working for a request honour it too.
+        """
+        handle = None
+        while handle is None:
+            handle = self._try_lock()
+            if handle is None:
+                if deadline is not None and time.monotonic() > deadline:
+                    with self._lock:
+                        self._rejected['timeout'] += 1
+                    raise SlotTimeout('Timed out waiting for a free OCR slot', self.retry_after)
+                time.sleep(0.05)
+        with self._lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+    def _try_lock(self):
+        for i in range(self.limit):
+            handle = open(os.path.join(self.lock_dir, f'slot-{i}.lock'), 'a')
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except BlockingIOError:
+                handle.close()
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'slots': self.limit,
+                'active_in_process': self._active,
+                'inflight_requests': self._inflight,
+                'max_inflight': self.max_inflight,
+                'rejected': dict(self._rejected)
+            }
+
+
+def slots_from_env(default_limit):
+    return OCRSlots(
+        limit=int(os.getenv('OCR_MAX_CONCURRENT', '0')) or default_limit,
+        lock_dir=os.getenv('OCR_SLOT_DIR'),
+        max_inflight=int(os.getenv('OCR_MAX_INFLIGHT', '32')),
+        wait=float(os.getenv('OCR_SLOT_WAIT', '30')),
+        retry_after=int(os.getenv('OCR_RETRY_AFTER', '10'))
+    )
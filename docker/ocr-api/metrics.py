@@ -0,0 +1,67 @@
+"""
+Prometheus metrics for the OCR API, served on /metrics.
+
+Per-stage timings separate slow uploads (network/disk) from slow OCR
+(ocrmypdf/Tesseract) and slow sidecar reads. Metrics are per process; with
+more than one gunicorn worker each scrape sees the worker that answered it.
+"""
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BYTES_BUCKETS = tuple(2 ** power for power in range(8, 31, 2))
+
+UPLOAD_RECEIVE_SECONDS = Histogram(
+    'ocr_upload_receive_seconds', 'Time spent receiving and spooling request bodies',
+    ['endpoint'], buckets=SECONDS_BUCKETS
+)
+OCRMYPDF_SECONDS = Histogram(
+    'ocr_ocrmypdf_seconds', 'Wall time of ocrmypdf runs, excluding time waiting for a slot',
+    ['kind'], buckets=SECONDS_BUCKETS
+)
+SIDECAR_READ_SECONDS = Histogram(
+    'ocr_sidecar_read_seconds', 'Time spent reading ocrmypdf sidecar text files',
+    ['kind'], buckets=SECONDS_BUCKETS
+)
+RESPONSE_BYTES = Histogram(
+    'ocr_response_bytes', 'Size of OCR endpoint response bodies',
+    ['endpoint'], buckets=BYTES_BUCKETS
+)
+PAGES_PROCESSED = Counter(
+    'ocr_pages_processed_total', 'Pages turned into text, by how the text was obtained',
+    ['source']
+)
+FAILURES = Counter(
+    'ocr_failures_total', 'Failed ocrmypdf runs by exit code',
+    ['exit_code']
+)
+IN_FLIGHT = Gauge(
+    'ocr_in_flight', 'OCR work currently in progress in this process',
+    ['kind']
+)
+
+
+def record_failure(returncode):
+    FAILURES.labels(str(returncode)).inc()
+
+
+def counted(body, histogram):
+    """Wrap a streamed response body and observe its total size when it ends"""
+    size = 0
+    try:
+        for chunk in body:
+            size += len(chunk) if isinstance(chunk, bytes) else len(chunk.encode('utf-8'))
+            yield chunk
+    finally:
+        histogram.observe(size)
+        if hasattr(body, 'close'):
+            body.close()
+
+
+def track_in_flight(kind, read_value):
+    """Report a gauge value read from the owning component at scrape time"""
+    IN_FLIGHT.labels(kind).set_function(read_value)
+
+
+def render():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,156 @@
+"""
+Page-parallel OCR.
+
+A PDF is split into page ranges with pikepdf, each range is OCR'd by its own
+single-threaded ocrmypdf process and results are yielded page by page as
+soon as their range finishes. The pool is sized to the CPUs actually
+available to the container (affinity and cgroup quota), so one large scan
+keeps every core busy without oversubscribing the host.
+"""
+
+import concurrent.futures
+import contextlib
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+
+import metrics
+
+# ocrmypdf separates pages in the sidecar file with a form feed
+PAGE_SEPARATOR = '\f'
+
+
+class RangeError(Exception):
+    def __init__(self, message, returncode=None):
+        super().__init__(message)
+        self.returncode = returncode
+
+
+def available_cpus():
+    """Number of CPUs this process may use, honouring cgroup CPU quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def page_count(input_path):
+    import pikepdf
+
+    with pikepdf.open(input_path) as pdf:
+        return len(pdf.pages)
+
+
+def text_layer_pages(input_path):
+    """Return the embedded text of every page, '' where there is none"""
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    texts = []
+    for layout in extract_pages(input_path):
+        texts.append(''.join(element.get_text() for element in layout
+                             if isinstance(element, LTTextContainer)))
+    return texts
+
+
+def smart_pages(input_path, command_prefix, workers=None, pages_per_range=1, min_chars=20,
+                slot=contextlib.nullcontext):
+    """Yield (page_number, text, source) using the text layer where one exists
+
+    Pages with at least min_chars of embedded non-whitespace text are
+    yielded straight away with source 'text_layer'; the remaining pages are
+    OCR'd in parallel and yielded with source 'ocr' as they finish.
+    """
+    try:
+        texts = text_layer_pages(input_path)
+    except Exception as e:
+        raise RangeError(f'Could not read PDF text layer: {e}')
+    needs_ocr = []
+    for number, text in enumerate(texts):
+        if len(''.join(text.split())) >= min_chars:
+            yield number, text, 'text_layer'
+        else:
+            needs_ocr.append(number)
+    if needs_ocr:
+        for number, text in ocr_pages(input_path, command_prefix, workers, pages_per_range, needs_ocr, slot):
+            yield number, text, 'ocr'
+
+
+def split_pages(input_path, out_dir, pages_per_range=1, page_numbers=None):
+    """Write page ranges of a PDF to out_dir and return [(page_numbers, path)]
+
+    Page numbers are zero-based. If page_numbers is given only those pages
+    are written, grouped pages_per_range at a time.
+    """
+    import pikepdf
+
+    ranges = []
+    with pikepdf.open(input_path) as pdf:
+        if page_numbers is None:
+            page_numbers = range(len(pdf.pages))
+        page_numbers = list(page_numbers)
+        for start in range(0, len(page_numbers), pages_per_range):
+            numbers = page_numbers[start:start + pages_per_range]
+            part = pikepdf.new()
+            part.pages.extend(pdf.pages[number] for number in numbers)
+            part_path = os.path.join(out_dir, f'pages-{numbers[0]:05d}.pdf')
+            part.save(part_path)
+            ranges.append((numbers, part_path))
+    return ranges
+
+
+def ocr_range(range_path, count, command_prefix, slot=contextlib.nullcontext):
+    """OCR one page range and return the text of each of its count pages"""
+    output_path = range_path + '.ocr.pdf'
+    sidecar_path = output_path + '.txt'
+    with slot(), metrics.OCRMYPDF_SECONDS.labels('range').time():
+        result = subprocess.run(
+            command_prefix + ['--jobs', '1', '--sidecar', sidecar_path, range_path, output_path],
+            capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        metrics.record_failure(result.returncode)
+        raise RangeError(result.stderr, result.returncode)
+    with metrics.SIDECAR_READ_SECONDS.labels('range').time(), open(sidecar_path, 'r') as f:
+        text = f.read()
+    pages = text.split(PAGE_SEPARATOR)[:count]
+    return pages + [''] * (count - len(pages))
+
+
+def ocr_pages(input_path, command_prefix, workers=None, pages_per_range=1, page_numbers=None,
+              slot=contextlib.nullcontext):
+    """Yield (page_number, text) in completion order while OCR runs in parallel
+
+    command_prefix is the ocrmypdf command line without the sidecar and the
+    input/output paths. page_numbers limits OCR to a subset of the pages.
+    slot is a context manager factory held around every ocrmypdf process.
+    Raises RangeError if any range fails.
+    """
+    workers = workers or available_cpus()
+    work_dir = tempfile.mkdtemp(prefix='ocr-pages-')
+    try:
+        try:
+            ranges = split_pages(input_path, work_dir, pages_per_range, page_numbers)
+        except Exception as e:
+            raise RangeError(f'Could not split PDF into pages: {e}')
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(ocr_range, path, len(numbers), command_prefix, slot): numbers
+                       for numbers, path in ranges}
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    yield from zip(futures[future], future.result())
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
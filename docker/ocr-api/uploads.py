@@ -0,0 +1,99 @@
+"""
+Upload spooling.
+
+Werkzeug normally buffers multipart file parts in a SpooledTemporaryFile
+which the handlers then copied to a second temp file. SpoolingRequest makes
+the parser write every file part straight into the spool directory while
+hashing it, so an upload hits the disk exactly once and its SHA-256 is known
+when parsing finishes. Raw request bodies (Content-Type: application/pdf)
+are spooled the same way. Anything not claimed by a handler is removed when
+the request ends.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+
+from flask import Request, current_app
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class HashingSpoolFile:
+    """Writable file in the spool directory that hashes everything written to it"""
+
+    def __init__(self, spool_dir):
+        os.makedirs(spool_dir, exist_ok=True)
+        fd, self.name = tempfile.mkstemp(suffix='.pdf', dir=spool_dir)
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self.claimed = False
+
+    def write(self, data):
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+    def discard(self):
+        self._file.close()
+        if not self.claimed and os.path.exists(self.name):
+            os.remove(self.name)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class SpoolingRequest(Request):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.spooled_uploads = []
+        # Seconds spent reading the body into the spool, for metrics
+        self.receive_seconds = 0.0
+
+    def _load_form_data(self):
+        start = time.monotonic()
+        try:
+            super()._load_form_data()
+        finally:
+            self.receive_seconds += time.monotonic() - start
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spooled = HashingSpoolFile(current_app.config['OCR_SPOOL_DIR'])
+        self.spooled_uploads.append(spooled)
+        return spooled
+
+    def spool_body(self):
+        """Spool a raw request body (e.g. application/pdf) like a file part"""
+        start = time.monotonic()
+        spooled = HashingSpoolFile(current_app.config['OCR_SPOOL_DIR'])
+        self.spooled_uploads.append(spooled)
+        while True:
+            chunk = self.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            spooled.write(chunk)
+        spooled.flush()
+        self.receive_seconds += time.monotonic() - start
+        return spooled
+
+
+def spooled_upload(file, claim=False):
+    """Return (path, sha256) of an uploaded file already written to the spool
+
+    Claimed uploads are left on disk when the request ends; the caller
+    becomes responsible for removing them.
+    """
+    spooled = getattr(file, 'stream', file)
+    spooled.flush()
+    spooled.claimed = spooled.claimed or claim
+    return spooled.name, spooled.hexdigest()
+
+
+def discard_unclaimed(request):
+    for spooled in getattr(request, 'spooled_uploads', ()):
+        spooled.discard()
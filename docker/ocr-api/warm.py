@@ -0,0 +1,103 @@
+"""
+Warm ocrmypdf worker pool.
+
+Running the ocrmypdf CLI per request pays interpreter startup and the
+import/plugin loading of ocrmypdf, pikepdf and friends every time, which
+dominates on one-page documents. WarmPool keeps long-lived worker processes
+that import everything once and call ocrmypdf's Python API per job. Workers
+are replaced after max_jobs_per_worker jobs to cap memory growth.
+
+Tesseract itself still runs as a child process per page inside ocrmypdf, so
+its language data is loaded per page either way.
+"""
+
+import collections
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+_worker_state = {}
+
+
+def _init_worker():
+    start = time.monotonic()
+    import ocrmypdf
+    from ocrmypdf.api import get_plugin_manager
+
+    get_plugin_manager([])
+    _worker_state['ocr'] = ocrmypdf.ocr
+    _worker_state['startup_seconds'] = time.monotonic() - start
+    _worker_state['jobs'] = 0
+
+
+def _worker_ocr(input_path, sidecar_path, language):
+    """Run one job inside a worker; returns (exit_code, error, seconds, cold, startup_seconds)"""
+    from ocrmypdf.exceptions import ExitCodeException
+
+    cold = _worker_state['jobs'] == 0
+    _worker_state['jobs'] += 1
+    kwargs = {'force_ocr': True, 'sidecar': sidecar_path, 'output_type': 'none',
+              'progress_bar': False, 'use_threads': True, 'jobs': 1}
+    if language:
+        kwargs['language'] = language.split('+')
+    start = time.monotonic()
+    try:
+        exit_code, error = int(_worker_state['ocr'](input_path, '-', **kwargs)), None
+    except ExitCodeException as e:
+        exit_code, error = int(e.exit_code), str(e) or type(e).__name__
+    except Exception as e:
+        exit_code, error = 15, str(e)  # ocrmypdf's "other error"
+    return exit_code, error, time.monotonic() - start, cold, _worker_state['startup_seconds'] if cold else None
+
+
+class WarmPool:
+    def __init__(self, workers, max_jobs_per_worker=50):
+        self.workers = workers
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._executor = None
+        self._lock = threading.Lock()
+        self._samples = {'cold': collections.deque(maxlen=500), 'warm': collections.deque(maxlen=500)}
+        self._startup = collections.deque(maxlen=100)
+
+    def _pool(self):
+        # Created on first use so it starts in the serving process, not before a fork
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                     max_tasks_per_child=self.max_jobs_per_worker or None)
+            return self._executor
+
+    def run(self, input_path, sidecar_path, language=None):
+        """OCR input_path into sidecar_path; returns (exit_code, error, seconds, cold)"""
+        future = self._pool().submit(_worker_ocr, os.path.abspath(input_path),
+                                     os.path.abspath(sidecar_path), language)
+        exit_code, error, seconds, cold, startup = future.result()
+        with self._lock:
+            self._samples['cold' if cold else 'warm'].append(seconds)
+            if startup is not None:
+                self._startup.append(startup)
+        return exit_code, error, seconds, cold
+
+    def stats(self):
+        with self._lock:
+            samples = {kind: sorted(values) for kind, values in self._samples.items()}
+            startup = list(self._startup)
+        return {
+            'workers': self.workers,
+            'max_jobs_per_worker': self.max_jobs_per_worker,
+            'worker_startup_seconds': round(sum(startup) / len(startup), 3) if startup else None,
+            **{kind: {
+                'jobs': len(values),
+                'avg_seconds': round(sum(values) / len(values), 3) if values else None,
+                'p50_seconds': round(values[len(values) // 2], 3) if values else None
+            } for kind, values in samples.items()}
+        }
+
+
+def pool_from_env():
+    """Create the warm pool if OCR_WARM_WORKERS > 0, otherwise None (CLI per request)"""
+    workers = int(os.getenv('OCR_WARM_WORKERS', '0'))
+    if workers <= 0:
+        return None
+    return WarmPool(workers, int(os.getenv('OCR_WARM_MAX_JOBS', '50')))
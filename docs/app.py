@@ -5,15 +5,19 @@ Real-time service monitoring dashboard with live status checking
 """
 
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 import os
 import asyncio
-import aiohttp
-import yaml
+import gzip
+import hashlib
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional
 import logging
+import math
+import time
+from array import array
 from datetime import datetime
 import json
 
@@ -21,37 +25,105 @@ import json
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="DocPro Dashboard", description="Service monitoring dashboard")
 
-# Create directories if they don't exist
-Path("templates").mkdir(exist_ok=True)
-Path("static").mkdir(exist_ok=True)
-
-# Setup templates only (static files optional)
-templates = Jinja2Templates(directory="templates")
-
-# Only mount static files if directory exists and has content
-if Path("static").exists() and any(Path("static").iterdir()):
-    from fastapi.staticfiles import StaticFiles
-
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+class ConfigState(NamedTuple):
+    """One fully loaded configuration; replaced as a whole, never mutated"""
+    config: Mapping[str, str]
+    services: Mapping[str, Dict]
+    ports: Mapping[str, str]
+    urls: Mapping[str, str]
+    files: tuple
 
 
 class ConfigLoader:
-    def __init__(self, env_file="../.env", compose_file="../docker-compose.yml"):
+    # Service name -> .env key holding its host port, with the default port
+    PORT_SETTINGS = {
+        'elasticsearch': ('ELASTICSEARCH_HTTP_PORT', '9200'),
+        'kibana': ('KIBANA_PORT', '5601'),
+        'node-red': ('NODE_RED_PORT', '1880'),
+        'minio': ('MINIO_CONSOLE_PORT', '9001'),
+        'tika': ('TIKA_PORT', '9998'),
+        'ollama': ('OLLAMA_PORT', '11437'),
+        'redis': ('REDIS_PORT', '6378'),
+        'ocr': ('OCR_PORT', '8082')
+    }
+
+    def __init__(self, env_file="../.env", compose_file="../docker-compose.yml", check_interval: float = 2.0):
         self.env_file = env_file
         self.compose_file = compose_file
-        self.config = self.load_env_config()
-        self.services = self.load_docker_services()
+        self.check_interval = check_interval
+        self._next_check = 0.0
+        self.state = self.load()
+
+    @property
+    def config(self) -> Mapping[str, str]:
+        return self.state.config
+
+    @property
+    def services(self) -> Mapping[str, Dict]:
+        return self.state.services
+
+    def env_candidates(self) -> List[str]:
+        return [self.env_file, ".env", "../.env", "../../.env"]
+
+    def compose_candidates(self) -> List[str]:
+        return [self.compose_file, "docker-compose.yml", "../docker-compose.yml", "../../docker-compose.yml"]
+
+    def watched_files(self) -> tuple:
+        """(path, inode, mtime, size) of the .env and compose files that would be loaded now"""
+        fingerprints = []
+        for candidates in (self.env_candidates(), self.compose_candidates()):
+            for path in candidates:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                fingerprints.append((path, st.st_ino, st.st_mtime_ns, st.st_size))
+                break
+            else:
+                fingerprints.append(None)
+        return tuple(fingerprints)
+
+    def load(self) -> ConfigState:
+        """Parse both files and precompute the service URL table"""
+        files = self.watched_files()
+        config = self.load_env_config()
+        services = self.load_docker_services()
+        ports = {name: config.get(key, default) for name, (key, default) in self.PORT_SETTINGS.items()}
+        for name, service in services.items():
+            if not ports.get(name):
+                ports[name] = str(service['port'])
+        return ConfigState(
+            config=MappingProxyType(config),
+            services=MappingProxyType(services),
+            ports=MappingProxyType(ports),
+            urls=MappingProxyType({name: f"http://localhost:{port}" for name, port in ports.items() if port}),
+            files=files
+        )
+
+    def reload_if_changed(self) -> bool:
+        """Reload when a watched file's inode, mtime or size changed
+
+        The files are stat'ed at most once per check_interval. The new state is
+        built completely before it replaces the old one, so readers always see
+        one consistent configuration.
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        if self.watched_files() == self.state.files:
+            return False
+        logger.info("Configuration files changed, reloading")
+        self.state = self.load()
+        return True
 
     def load_env_config(self) -> Dict[str, str]:
         """Load environment variables from .env file"""
         config = {}
 
         # Try different locations for .env file
-        possible_env_files = [self.env_file, ".env", "../.env", "../../.env"]
-
-        for env_file in possible_env_files:
+        for env_file in self.env_candidates():
             if os.path.exists(env_file):
                 logger.info(f"Loading config from: {env_file}")
                 with open(env_file, 'r') as f:
@@ -71,13 +143,12 @@ class ConfigLoader:
         services = {}
 
         # Try different locations for docker-compose.yml
-        possible_compose_files = [self.compose_file, "docker-compose.yml", "../docker-compose.yml",
-                                  "../../docker-compose.yml"]
-
-        for compose_file in possible_compose_files:
+        for compose_file in self.compose_candidates():
             if os.path.exists(compose_file):
                 try:
                     logger.info(f"Loading services from: {compose_file}")
+                    import yaml
+
                     with open(compose_file, 'r') as f:
                         compose_data = yaml.safe_load(f)
                         if 'services' in compose_data:
@@ -101,36 +172,168 @@ class ConfigLoader:
 
     def get_service_url(self, service_name: str, host: str = "localhost") -> Optional[str]:
         """Get service URL based on configuration"""
-        port_mappings = {
-            'elasticsearch': self.config.get('ELASTICSEARCH_HTTP_PORT', '9200'),
-            'kibana': self.config.get('KIBANA_PORT', '5601'),
-            'node-red': self.config.get('NODE_RED_PORT', '1880'),
-            'minio': self.config.get('MINIO_CONSOLE_PORT', '9001'),
-            'tika': self.config.get('TIKA_PORT', '9998'),
-            'ollama': self.config.get('OLLAMA_PORT', '11437'),
-            'redis': self.config.get('REDIS_PORT', '6378'),
-            'ocr': self.config.get('OCR_PORT', '8082')
+        self.reload_if_changed()
+        state = self.state
+        if host == "localhost":
+            return state.urls.get(service_name)
+        port = state.ports.get(service_name)
+        return f"http://{host}:{port}" if port else None
+
+
+
+
+class HealthHistory:
+    """Fixed-size ring buffer of (timestamp, status, latency) samples for one service
+
+    Backed by three preallocated arrays, so memory is capacity * 17 bytes no
+    matter how long the dashboard runs. Missing latencies are stored as NaN.
+    """
+
+    STATUSES = ('online', 'degraded', 'offline', 'not_configured')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array('d', [0.0]) * capacity
+        self.latencies = array('d', [math.nan]) * capacity
+        self.statuses = array('b', [0]) * capacity
+        self.count = 0
+        self.next = 0
+
+    def record(self, timestamp: float, status: str, latency: Optional[float]):
+        i = self.next
+        self.timestamps[i] = timestamp
+        self.statuses[i] = self.STATUSES.index(status) if status in self.STATUSES else 2
+        self.latencies[i] = math.nan if latency is None else latency
+        self.next = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def summary(self, window: float, now: float) -> Dict:
+        """Latency percentiles and availability over the last `window` seconds"""
+        since = now - window
+        latencies = []
+        checks = online = 0
+        for j in range(self.count):
+            i = (self.next - 1 - j) % self.capacity
+            if self.timestamps[i] < since:
+                break  # samples are stored in time order, everything older follows
+            status = self.statuses[i]
+            if status == 3:
+                continue
+            checks += 1
+            if status == 0:
+                online += 1
+            if not math.isnan(self.latencies[i]):
+                latencies.append(self.latencies[i])
+        latencies.sort()
+        return {
+            'checks': checks,
+            'availability': round(online / checks * 100, 2) if checks else None,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99)
         }
 
-        port = port_mappings.get(service_name)
-        if port:
-            return f"http://{host}:{port}"
-
-        # Fallback to docker-compose services
-        if service_name in self.services:
-            port = self.services[service_name]['port']
-            return f"http://{host}:{port}"
 
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
         return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+
+HISTORY_WINDOWS = {'5m': 300, '1h': 3600, '24h': 86400}
+
+
+class RedisProbe:
+    """Minimal RESP client that keeps one connection open between health checks"""
+
+    def __init__(self):
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    async def _command(self, *args: str):
+        reader, writer = self._conn
+        writer.write(f"*{len(args)}\r\n".encode() +
+                     b"".join(f"${len(a.encode())}\r\n{a}\r\n".encode() for a in args))
+        await writer.drain()
+        return await self._reply(reader)
+
+    async def _reply(self, reader):
+        line = (await reader.readline()).rstrip(b"\r\n")
+        if not line:
+            raise ConnectionError("Connection closed by Redis")
+        kind, rest = line[:1], line[1:].decode()
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise RuntimeError(rest)
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            return None if rest == "-1" else (await reader.readexactly(int(rest) + 2))[:-2].decode()
+        raise RuntimeError(f"Unexpected Redis reply: {line[:40]!r}")
+
+    async def check(self, host: str, port: int, password: Optional[str] = None) -> Dict:
+        async with self._lock:
+            try:
+                if self._conn is None:
+                    self._conn = await asyncio.open_connection(host, port)
+                    if password:
+                        await self._command("AUTH", password)
+                pong = await self._command("PING")
+                info = dict(
+                    line.split(":", 1) for line in (await self._command("INFO")).splitlines()
+                    if ":" in line and not line.startswith("#")
+                )
+            except BaseException:
+                await self.close()
+                raise
+        return {
+            'status': 'online' if pong == 'PONG' else 'degraded',
+            'status_code': None,
+            'details': {
+                'used_memory': info.get('used_memory_human'),
+                'used_memory_bytes': int(info['used_memory']) if 'used_memory' in info else None,
+                'ops_per_sec': int(info['instantaneous_ops_per_sec']) if 'instantaneous_ops_per_sec' in info else None,
+                'connected_clients': int(info['connected_clients']) if 'connected_clients' in info else None,
+                'version': info.get('redis_version')
+            }
+        }
 
-
-# Global config loader
-config_loader = ConfigLoader()
+    async def close(self):
+        if self._conn is not None:
+            self._conn[1].close()
+            self._conn = None
 
 
 class ServiceMonitor:
-    def __init__(self, config_loader: ConfigLoader):
+    def __init__(self, config_loader: ConfigLoader, probe_timeout: float = 5.0, round_deadline: float = 6.0,
+                 poll_interval: float = 15.0, stale_after: float = 45.0, latency_delta_ms: float = 100.0,
+                 history_size: int = 0):
         self.config_loader = config_loader
+        self.probe_timeout = probe_timeout
+        self.round_deadline = round_deadline
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self.snapshot: Optional[Dict] = None
+        self._refresh_lock = asyncio.Lock()
+        self._poller: Optional[asyncio.Task] = None
+        self.latency_delta_ms = latency_delta_ms
+        self._subscribers = set()
+        self._aggregate: Optional[tuple] = None
+        # Enough samples to cover the longest history window at the poll rate
+        self.history_size = history_size or int(max(HISTORY_WINDOWS.values()) / poll_interval) + 1
+        self.history: Dict[str, HealthHistory] = {}
+        self.redis_probe = RedisProbe()
+        self._es_indexing: Optional[tuple] = None
+        # Protocol-specific checkers; services without a 'checker' use the plain HTTP GET
+        self.checkers = {
+            'http': self.check_http,
+            'elasticsearch': self.check_elasticsearch,
+            'tika': self.check_tika,
+            'redis': self.check_redis
+        }
         self.service_definitions = {
             'elasticsearch': {
                 'name': 'Elasticsearch',
@@ -138,6 +341,7 @@ class ServiceMonitor:
                 'icon': 'fas fa-search',
                 'color': 'warning',
                 'health_endpoint': '/_cluster/health',
+                'checker': 'elasticsearch',
                 'category': 'Core'
             },
             'kibana': {
@@ -170,6 +374,7 @@ class ServiceMonitor:
                 'icon': 'fas fa-file-alt',
                 'color': 'info',
                 'health_endpoint': '/tika',
+                'checker': 'tika',
                 'category': 'Processing'
             },
             'ollama': {
@@ -185,7 +390,8 @@ class ServiceMonitor:
                 'description': 'In-memory data structure store',
                 'icon': 'fas fa-memory',
                 'color': 'dark',
-                'health_endpoint': '/',
+                'health_endpoint': None,
+                'checker': 'redis',
                 'category': 'Cache'
             },
             'ocr': {
@@ -198,117 +404,409 @@ class ServiceMonitor:
             }
         }
 
+    async def start(self):
+        """Create the shared, pooled HTTP session used by all probes"""
+        if self.session is None or self.session.closed:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(limit=32, limit_per_host=4, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        await self.redis_probe.close()
+
+    def start_polling(self):
+        """Start the background task that keeps the status snapshot current"""
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll_forever())
+
+    async def _poll_forever(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error polling services: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def refresh(self) -> Dict:
+        """Probe all services and replace the snapshot
+
+        Concurrent callers share one probe round instead of starting their own.
+        """
+        requested_at = asyncio.get_event_loop().time()
+        async with self._refresh_lock:
+            if self.snapshot is not None and self.snapshot['monotonic'] >= requested_at:
+                return self.snapshot
+            services = await self.get_all_services_status()
+            previous = self.snapshot
+            self.snapshot = {
+                'services': services,
+                'as_of': datetime.now(),
+                'monotonic': asyncio.get_event_loop().time()
+            }
+            self.record_history(services)
+            if previous is not None and self._subscribers:
+                changes = self.status_changes(previous['services'], services)
+                if changes:
+                    self._publish(sse_event('delta', {
+                        'as_of': self.snapshot['as_of'].isoformat(),
+                        'changes': changes
+                    }))
+            return self.snapshot
+
+    def record_history(self, services: List[Dict]):
+        now = time.time()
+        for service in services:
+            history = self.history.get(service['name'])
+            if history is None:
+                history = self.history[service['name']] = HealthHistory(self.history_size)
+            history.record(now, service['status'], service['response_time'])
+
+    def status_changes(self, before: List[Dict], after: List[Dict]) -> List[Dict]:
+        """Services whose status changed or whose latency moved by more than latency_delta_ms"""
+        previous = {service['name']: service for service in before}
+        changes = []
+        for service in after:
+            old = previous.get(service['name'])
+            if old is None or old['status'] != service['status']:
+                changes.append({**service, 'previous_status': old['status'] if old else None})
+                continue
+            if old['response_time'] is not None and service['response_time'] is not None and \
+                    abs(service['response_time'] - old['response_time']) > self.latency_delta_ms:
+                changes.append({**service, 'previous_status': old['status']})
+        return changes
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a push client; it receives pre-encoded SSE events"""
+        queue = asyncio.Queue(maxsize=32)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, event: str):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client: drop its backlog and tell it to resync from a full snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def get_snapshot(self, fresh: bool = False) -> Dict:
+        """Latest snapshot, probing synchronously if forced or none exists yet"""
+        if fresh or self.snapshot is None:
+            return await self.refresh()
+        return self.snapshot
+
+    def aggregate(self, snapshot: Dict) -> Dict:
+        """Status counters, category groups and health percentage of a snapshot
+
+        Computed in a single pass over the services and memoized until the
+        snapshot is replaced, so every endpoint reports the same numbers.
+        """
+        cached = self._aggregate
+        if cached is not None and cached[0] is snapshot:
+            return cached[1]
+
+        counts = {'online': 0, 'offline': 0, 'degraded': 0, 'not_configured': 0}
+        by_category: Dict[str, List[Dict]] = {}
+        for service in snapshot['services']:
+            counts[service['status']] = counts.get(service['status'], 0) + 1
+            by_category.setdefault(service['category'], []).append(service)
+
+        total = len(snapshot['services'])
+        configured = total - counts['not_configured']
+        result = {
+            'total_services': total,
+            'configured_services': configured,
+            'online_services': counts['online'],
+            'offline_services': counts['offline'],
+            'degraded_services': counts['degraded'],
+            'not_configured': counts['not_configured'],
+            'services_by_category': by_category,
+            'categories': list(by_category),
+            'health_percentage': round(counts['online'] / configured * 100, 1) if configured else 0
+        }
+        self._aggregate = (snapshot, result)
+        return result
+
+    def snapshot_meta(self, snapshot: Dict) -> Dict:
+        age = asyncio.get_event_loop().time() - snapshot['monotonic']
+        return {
+            'as_of': snapshot['as_of'].isoformat(),
+            'age_seconds': round(age, 3),
+            'stale_after': self.stale_after,
+            'stale': age > self.stale_after
+        }
+
     async def check_service_health(self, service_name: str, url: str, health_endpoint: str = '/') -> Dict:
-        """Check health of a single service"""
+        """Check health of a single service with its protocol-specific checker"""
+        checker = self.checkers[self.service_definitions.get(service_name, {}).get('checker', 'http')]
         try:
-            timeout = aiohttp.ClientTimeout(total=5)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                health_url = f"{url.rstrip('/')}{health_endpoint}"
-                start_time = asyncio.get_event_loop().time()
-
-                async with session.get(health_url) as response:
-                    end_time = asyncio.get_event_loop().time()
-                    response_time = round((end_time - start_time) * 1000, 2)  # ms
-
-                    status = 'online' if response.status < 400 else 'degraded'
-                    return {
-                        'status': status,
-                        'response_time': response_time,
-                        'status_code': response.status,
-                        'error': None
-                    }
+            if self.session is None or self.session.closed:
+                await self.start()
+            start_time = asyncio.get_event_loop().time()
+            result = await asyncio.wait_for(checker(url, health_endpoint or '/'), timeout=self.probe_timeout)
+            end_time = asyncio.get_event_loop().time()
+            return {
+                'response_time': round((end_time - start_time) * 1000, 2),  # ms
+                'error': None,
+                'details': None,
+                **result
+            }
         except Exception as e:
             return {
                 'status': 'offline',
                 'response_time': None,
                 'status_code': None,
-                'error': str(e)
+                'error': str(e) or type(e).__name__,
+                'details': None
             }
 
-    async def get_all_services_status(self) -> List[Dict]:
-        """Get status of all configured services"""
-        services_status = []
+    async def check_http(self, url: str, health_endpoint: str) -> Dict:
+        async with self.session.get(f"{url.rstrip('/')}{health_endpoint}") as response:
+            return {'status': 'online' if response.status < 400 else 'degraded', 'status_code': response.status}
+
+    async def _get_json(self, url: str) -> tuple:
+        async with self.session.get(url) as response:
+            return response.status, (await response.json(content_type=None) if response.status < 400 else None)
+
+    async def check_elasticsearch(self, url: str, health_endpoint: str) -> Dict:
+        """Cluster health, pending tasks, indexing rate and the documents index size"""
+        base = url.rstrip('/')
+        (status_code, health), (_, stats), (count_status, count) = await asyncio.gather(
+            self._get_json(f"{base}{health_endpoint}"),
+            self._get_json(f"{base}/_stats/indexing"),
+            self._get_json(f"{base}/documents/_count")
+        )
+        if health is None:
+            return {'status': 'degraded', 'status_code': status_code}
+
+        indexing_rate = None
+        if stats is not None:
+            index_total = stats['_all']['primaries'].get('indexing', {}).get('index_total', 0)
+            now = asyncio.get_event_loop().time()
+            if self._es_indexing is not None and now > self._es_indexing[1]:
+                indexing_rate = round(max(0, index_total - self._es_indexing[0]) / (now - self._es_indexing[1]), 2)
+            self._es_indexing = (index_total, now)
+
+        cluster_status = health.get('status')
+        return {
+            'status': 'online' if cluster_status in ('green', 'yellow') else 'degraded',
+            'status_code': status_code,
+            'details': {
+                'cluster_status': cluster_status,
+                'pending_tasks': health.get('number_of_pending_tasks'),
+                'indexing_rate': indexing_rate,  # docs/s since the previous check
+                'documents_count': count['count'] if count else None,
+                'documents_index': count_status != 404
+            }
+        }
 
-        for service_name, service_def in self.service_definitions.items():
-            url = self.config_loader.get_service_url(service_name)
+    async def check_tika(self, url: str, health_endpoint: str) -> Dict:
+        """Time a real parse of a tiny text document rather than just the banner page"""
+        async with self.session.put(f"{url.rstrip('/')}{health_endpoint}", data=b"DocPro health check",
+                                    headers={'Content-Type': 'text/plain', 'Accept': 'text/plain'}) as response:
+            text = await response.text()
+            parsed = response.status < 400 and 'DocPro health check' in text
+            return {
+                'status': 'online' if parsed else 'degraded',
+                'status_code': response.status,
+                'details': {'parse_ok': parsed}
+            }
 
-            if url:
-                health_data = await self.check_service_health(
-                    service_name,
-                    url,
-                    service_def.get('health_endpoint', '/')
-                )
+    async def check_redis(self, url: str, health_endpoint: str) -> Dict:
+        host, _, port = url.split('://', 1)[-1].rstrip('/').rpartition(':')
+        return await self.redis_probe.check(host, int(port), self.config_loader.config.get('REDIS_PASSWORD') or None)
 
-                service_info = {
-                    'name': service_name,
-                    'display_name': service_def['name'],
-                    'description': service_def['description'],
-                    'icon': service_def['icon'],
-                    'color': service_def['color'],
-                    'category': service_def['category'],
-                    'url': url,
-                    'port': url.split(':')[-1] if ':' in url else 'unknown',
-                    **health_data
-                }
-                services_status.append(service_info)
-            else:
-                # Service not configured
-                service_info = {
-                    'name': service_name,
-                    'display_name': service_def['name'],
-                    'description': service_def['description'],
-                    'icon': service_def['icon'],
-                    'color': service_def['color'],
-                    'category': service_def['category'],
-                    'url': None,
-                    'port': 'not configured',
+    def service_info(self, service_name: str, url: Optional[str], health_data: Dict) -> Dict:
+        """Combine a service definition with its probe result"""
+        service_def = self.service_definitions[service_name]
+        return {
+            'name': service_name,
+            'display_name': service_def['name'],
+            'description': service_def['description'],
+            'icon': service_def['icon'],
+            'color': service_def['color'],
+            'category': service_def['category'],
+            'url': url,
+            'port': (url.split(':')[-1] if ':' in url else 'unknown') if url else 'not configured',
+            **health_data
+        }
+
+    async def get_all_services_status(self) -> List[Dict]:
+        """Get status of all configured services
+
+        All probes run concurrently; the round is cut off after
+        round_deadline seconds and unfinished probes are reported offline.
+        """
+        urls = {name: self.config_loader.get_service_url(name) for name in self.service_definitions}
+        probes = {
+            name: asyncio.create_task(self.check_service_health(
+                name, url, self.service_definitions[name].get('health_endpoint', '/')
+            ))
+            for name, url in urls.items() if url
+        }
+        if probes:
+            _, pending = await asyncio.wait(probes.values(), timeout=self.round_deadline)
+            for task in pending:
+                task.cancel()
+
+        services_status = []
+        for service_name, url in urls.items():
+            if not url:
+                health_data = {
                     'status': 'not_configured',
                     'response_time': None,
                     'status_code': None,
-                    'error': 'Service not configured in .env'
+                    'error': 'Service not configured in .env',
+                    'details': None
                 }
-                services_status.append(service_info)
+            elif probes[service_name].cancelled() or not probes[service_name].done():
+                health_data = {
+                    'status': 'offline',
+                    'response_time': None,
+                    'status_code': None,
+                    'error': f'No response within {self.round_deadline}s',
+                    'details': None
+                }
+            else:
+                health_data = probes[service_name].result()
+            services_status.append(self.service_info(service_name, url, health_data))
 
         return services_status
 
 
-# Global service monitor
-service_monitor = ServiceMonitor(config_loader)
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
-@app.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request):
-    """Main dashboard page"""
+class RenderedPage(NamedTuple):
+    """Dashboard HTML rendered for one snapshot and config, in every encoding we serve"""
+    snapshot: Dict
+    config_state: ConfigState
+    etag: str
+    bodies: Dict[str, bytes]
+
+
+def precompress(html: str) -> Dict[str, bytes]:
+    body = html.encode('utf-8')
+    bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=6)}
     try:
-        services = await service_monitor.get_all_services_status()
+        import brotli
+    except ImportError:
+        return bodies
+    bodies['br'] = brotli.compress(body, quality=5)
+    return bodies
+
+
+def pick_encoding(accept_encoding: str, available: Dict[str, bytes]) -> str:
+    """Best encoding the client accepts, preferring br over gzip"""
+    accepted = set()
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip())
+    for encoding in ('br', 'gzip'):
+        if encoding in available and (encoding in accepted or '*' in accepted):
+            return encoding
+    return 'identity'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(',')}
+    return '*' in tags or etag in tags or etag[2:] in tags
+
+
+# Set up by lifespan() when the server starts, not at import
+config_loader: Optional[ConfigLoader] = None
+service_monitor: Optional[ServiceMonitor] = None
+templates = None
+dashboard_page: Optional[RenderedPage] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load config and templates and start the service monitor once the server is starting"""
+    global config_loader, service_monitor, templates
+    from fastapi.templating import Jinja2Templates
+
+    # Create directories if they don't exist
+    Path("templates").mkdir(exist_ok=True)
+    Path("static").mkdir(exist_ok=True)
+
+    # Setup templates only (static files optional)
+    templates = Jinja2Templates(directory="templates")
+
+    # Only mount static files if directory has content
+    if any(Path("static").iterdir()) and not any(getattr(r, 'name', None) == 'static' for r in app.routes):
+        from fastapi.staticfiles import StaticFiles
+
+        app.mount("/static", StaticFiles(directory="static"), name="static")
+
+    config_loader = ConfigLoader(check_interval=float(os.getenv('DASHBOARD_CONFIG_CHECK_INTERVAL', '2')))
+    service_monitor = ServiceMonitor(
+        config_loader,
+        probe_timeout=float(os.getenv('DASHBOARD_PROBE_TIMEOUT', '5')),
+        round_deadline=float(os.getenv('DASHBOARD_PROBE_DEADLINE', '6')),
+        poll_interval=float(os.getenv('DASHBOARD_POLL_INTERVAL', '15')),
+        stale_after=float(os.getenv('DASHBOARD_STALE_AFTER', '45')),
+        latency_delta_ms=float(os.getenv('DASHBOARD_LATENCY_DELTA_MS', '100')),
+        history_size=int(os.getenv('DASHBOARD_HISTORY_SIZE', '0'))
+    )
+    await service_monitor.start()
+    service_monitor.start_polling()
+    try:
+        yield
+    finally:
+        await service_monitor.close()
+
+
+app = FastAPI(title="DocPro Dashboard", description="Service monitoring dashboard", lifespan=lifespan)
+
+
+def render_dashboard(snapshot: Dict) -> RenderedPage:
+    """Rendered dashboard for a snapshot; re-rendered only when the snapshot or config changes"""
+    global dashboard_page
+    config_state = config_loader.state
+    page = dashboard_page
+    if page is not None and page.snapshot is snapshot and page.config_state is config_state:
+        return page
+
+    summary = service_monitor.aggregate(snapshot)
+    context = {
+        "services": snapshot['services'],
+        "services_by_category": summary['services_by_category'],
+        "config": config_state.config,
+        "health_percentage": summary['health_percentage'],
+        "online_count": summary['online_services'],
+        "total_count": summary['configured_services'],
+        "last_updated": snapshot['as_of'].strftime("%Y-%m-%d %H:%M:%S")
+    }
 
-        # Group services by category
-        services_by_category = {}
-        for service in services:
-            category = service['category']
-            if category not in services_by_category:
-                services_by_category[category] = []
-            services_by_category[category].append(service)
-
-        # Calculate overall health
-        configured_services = [s for s in services if s['status'] != 'not_configured']
-        online_count = sum(1 for s in configured_services if s['status'] == 'online')
-        total_count = len(configured_services)
-        health_percentage = (online_count / total_count * 100) if total_count > 0 else 0
-
-        context = {
-            "request": request,
-            "services": services,
-            "services_by_category": services_by_category,
-            "config": config_loader.config,
-            "health_percentage": round(health_percentage, 1),
-            "online_count": online_count,
-            "total_count": total_count,
-            "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+    bodies = precompress(templates.get_template("dashboard.html").render(context))
+    etag = f'W/"{hashlib.sha1(bodies["identity"]).hexdigest()[:20]}"'
+    dashboard_page = RenderedPage(snapshot, config_state, etag, bodies)
+    return dashboard_page
 
-        return templates.TemplateResponse("dashboard.html", context)
 
+@app.get("/", response_class=HTMLResponse)
+async def dashboard(request: Request, fresh: bool = False):
+    """Main dashboard page, served from the per-snapshot render cache"""
+    try:
+        snapshot = await service_monitor.get_snapshot(fresh=fresh)
+        page = render_dashboard(snapshot)
     except Exception as e:
         logger.error(f"Error rendering dashboard: {e}")
         # Return simple HTML if template fails
@@ -334,17 +832,28 @@ async def dashboard(request: Request):
         </html>
         """)
 
+    headers = {'ETag': page.etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if etag_matches(request.headers.get('if-none-match'), page.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = pick_encoding(request.headers.get('accept-encoding', ''), page.bodies)
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return HTMLResponse(page.bodies[encoding], headers=headers)
+
 
 @app.get("/api/services")
-async def get_services_api():
+async def get_services_api(fresh: bool = False):
     """API endpoint to get services status"""
     try:
-        services = await service_monitor.get_all_services_status()
+        snapshot = await service_monitor.get_snapshot(fresh=fresh)
+        summary = service_monitor.aggregate(snapshot)
         return {
-            "services": services,
+            "services": snapshot['services'],
             "timestamp": datetime.now().isoformat(),
-            "total_services": len(services),
-            "online_services": len([s for s in services if s['status'] == 'online']),
+            **service_monitor.snapshot_meta(snapshot),
+            "total_services": summary['total_services'],
+            "online_services": summary['online_services'],
+            "health_percentage": summary['health_percentage'],
             "config_loaded": bool(config_loader.config),
             "env_file_found": os.path.exists(config_loader.env_file)
         }
@@ -353,6 +862,33 @@ async def get_services_api():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/services/stream")
+async def stream_services(request: Request):
+    """Server-sent events: a full snapshot on connect, then status deltas from the shared poller"""
+    queue = service_monitor.subscribe()
+
+    def snapshot_event(snapshot: Dict) -> str:
+        return sse_event('snapshot', {'services': snapshot['services'], **service_monitor.snapshot_meta(snapshot)})
+
+    async def events():
+        try:
+            yield snapshot_event(await service_monitor.get_snapshot())
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield event if event is not None else snapshot_event(await service_monitor.get_snapshot())
+        finally:
+            service_monitor.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
 @app.get("/api/service/{service_name}/health")
 async def get_service_health(service_name: str):
     """Get health status of a specific service"""
@@ -378,12 +914,30 @@ async def get_service_health(service_name: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/service/{service_name}/history")
+async def get_service_history(service_name: str):
+    """Rolling latency percentiles and availability of a service from the poller's history"""
+    if service_name not in service_monitor.service_definitions:
+        raise HTTPException(status_code=404, detail=f"Service {service_name} not found")
+    # Before the first poll round there is no history yet; report empty windows
+    history = service_monitor.history.get(service_name) or HealthHistory(1)
+    now = time.time()
+    return {
+        "service": service_name,
+        "samples": history.count,
+        "capacity": service_monitor.history_size,
+        "poll_interval": service_monitor.poll_interval,
+        "windows": {label: history.summary(seconds, now) for label, seconds in HISTORY_WINDOWS.items()},
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 @app.get("/api/config")
 async def get_config():
     """Get current configuration"""
     return {
-        "env_config": config_loader.config,
-        "docker_services": config_loader.services,
+        "env_config": dict(config_loader.config),
+        "docker_services": dict(config_loader.services),
         "config_files": {
             "env_file": config_loader.env_file,
             "compose_file": config_loader.compose_file,
@@ -395,32 +949,25 @@ async def get_config():
 
 
 @app.get("/api/stats")
-async def get_stats():
+async def get_stats(fresh: bool = False):
     """Get system statistics"""
     try:
-        services = await service_monitor.get_all_services_status()
-
-        stats = {
-            "total_services": len(services),
-            "online_services": len([s for s in services if s['status'] == 'online']),
-            "offline_services": len([s for s in services if s['status'] == 'offline']),
-            "degraded_services": len([s for s in services if s['status'] == 'degraded']),
-            "not_configured": len([s for s in services if s['status'] == 'not_configured']),
-            "categories": list(set(s['category'] for s in services)),
+        snapshot = await service_monitor.get_snapshot(fresh=fresh)
+        summary = service_monitor.aggregate(snapshot)
+
+        return {
+            "total_services": summary['total_services'],
+            "online_services": summary['online_services'],
+            "offline_services": summary['offline_services'],
+            "degraded_services": summary['degraded_services'],
+            "not_configured": summary['not_configured'],
+            "categories": summary['categories'],
             "config_loaded": len(config_loader.config),
-            "last_check": datetime.now().isoformat()
+            "last_check": snapshot['as_of'].isoformat(),
+            **service_monitor.snapshot_meta(snapshot),
+            "health_percentage": summary['health_percentage']
         }
 
-        configured_services = stats["total_services"] - stats["not_configured"]
-        if configured_services > 0:
-            stats["health_percentage"] = round(
-                (stats["online_services"] / configured_services) * 100, 1
-            )
-        else:
-            stats["health_percentage"] = 0
-
-        return stats
-
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -442,15 +989,16 @@ if __name__ == "__main__":
     port = int(os.getenv('DASHBOARD_PORT', 8000))
     host = os.getenv('DASHBOARD_HOST', '0.0.0.0')
 
+    # Reload watches the source tree and re-imports the app; only for development
+    reload = os.getenv('DASHBOARD_RELOAD', 'false').lower() in ('1', 'true', 'yes')
+
     print(f"🚀 Starting DocPro Dashboard on {host}:{port}")
     print(f"📊 Dashboard URL: http://localhost:{port}")
-    print(f"🔧 Config loaded from: {config_loader.env_file}")
-    print(f"📁 Services loaded: {len(config_loader.services)}")
 
     uvicorn.run(
-        "app:app",
+        "app:app" if reload else app,
         host=host,
         port=port,
-        reload=True,
+        reload=reload,
         log_level="info"
     )
\ No newline at end of file
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Dashboard startup benchmark.
+
+Measures how long `import app` takes and how long the production entry
+point (`python app.py`) needs from process start to the first successful
+response, and reports both as JSON. With --baseline the run is compared
+against an earlier report and exits non-zero when a median regresses by
+more than --max-regression.
+
+Usage: python3 bench_startup.py [--runs 5] [--output startup.json]
+                                [--baseline startup.json] [--max-regression 0.25]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_PROBE = 'import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure_import():
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=HERE, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_response(path, timeout):
+    """Seconds from spawning the server until `path` answers 200"""
+    port = free_port()
+    env = dict(os.environ, DASHBOARD_PORT=str(port), DASHBOARD_HOST='127.0.0.1', DASHBOARD_RELOAD='false')
+    start = time.monotonic()
+    server = subprocess.Popen([sys.executable, 'app.py'], cwd=HERE, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.monotonic() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f'dashboard exited with code {server.returncode}')
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=timeout) as response:
+                    if response.status == 200:
+                        return time.monotonic() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f'no response from {path} within {timeout}s')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summary(samples):
+    return {'median': round(statistics.median(samples), 4), 'min': round(min(samples), 4),
+            'max': round(max(samples), 4)}
+
+
+def compare(report, baseline, max_regression):
+    """Median changes against a baseline report; returns (deltas, regressed)"""
+    deltas, regressed = {}, False
+    for name, result in report['results'].items():
+        before = baseline.get('results', {}).get(name, {}).get('median')
+        if not before:
+            continue
+        change = (result['median'] - before) / before
+        deltas[name] = round(change, 3)
+        regressed = regressed or change > max_regression
+    return deltas, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DocPro dashboard startup')
+    parser.add_argument('--runs', type=int, default=5, help='Measurements per metric')
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds to wait for the first response')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--baseline', help='Earlier report to compare medians against')
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help='Allowed relative slowdown of a median before failing')
+    args = parser.parse_args()
+
+    results = {'import_seconds': [], 'first_health_seconds': [], 'first_services_seconds': []}
+    for run in range(args.runs):
+        print(f'⏱️  run {run + 1}/{args.runs}', file=sys.stderr)
+        results['import_seconds'].append(measure_import())
+        results['first_health_seconds'].append(measure_first_response('/health', args.timeout))
+        results['first_services_seconds'].append(measure_first_response('/api/services', args.timeout))
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+        'results': {name: summary(samples) for name, samples in results.items()}
+    }
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['change_vs_baseline'], regressed = compare(report, json.load(f), args.max_regression)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'✅ Report written to {args.output}', file=sys.stderr)
+    print(output)
+    if regressed:
+        print(f'❌ Startup regressed by more than {args.max_regression:.0%}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
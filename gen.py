@@ -8,10 +8,22 @@ Usage: python generate-dashboard.py [--env-file .env] [--output web/]
 import os
 import json
 import re
+import email.utils
+import functools
+import gzip
+import hashlib
+import http.server
+import tempfile
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 import argparse
 
+# Bump when generate_main_dashboard() or the other outputs change, so existing files are rebuilt
+TEMPLATE_VERSION = '2'
+FINGERPRINT_FILE = '.fingerprints.json'
+
 
 class DashboardGenerator:
     def __init__(self, env_file='.env', output_dir='web'):
@@ -589,35 +601,132 @@ class DashboardGenerator:
 
         return template
 
-    def generate(self):
-        """Generate all documentation files"""
-        print(f"📄 Generating DocPro dashboard from {self.env_file}...")
+    def input_fingerprint(self, output_name):
+        """Hash of everything an output depends on; the generation timestamp is deliberately left out"""
+        inputs = json.dumps({'template': TEMPLATE_VERSION, 'output': output_name, 'config': self.config},
+                            sort_keys=True)
+        return hashlib.sha256(inputs.encode('utf-8')).hexdigest()
+
+    def load_fingerprints(self):
+        try:
+            with open(self.output_dir / FINGERPRINT_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_atomic(self, path, data):
+        """Write data to path and a gzip copy next to it, each replaced in one rename"""
+        for target, content in ((path, data), (Path(f"{path}.gz"), gzip.compress(data, mtime=0))):
+            fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, prefix=f".{target.name}.")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(content)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, target)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    def render_outputs(self):
+        """Output file name -> function returning its content"""
+        def urls_text():
+            lines = [f"DocPro Service URLs (Generated: {self.timestamp})", "=" * 50, ""]
+            lines += [f"{service.replace('_', ' ').title()}: {url}" for service, url in self.get_service_urls().items()]
+            return "\n".join(lines) + "\n"
 
-        # Generate main dashboard
-        dashboard_html = self.generate_main_dashboard()
-        dashboard_file = self.output_dir / 'index.html'
-        with open(dashboard_file, 'w', encoding='utf-8') as f:
-            f.write(dashboard_html)
-        print(f"✅ Generated: {dashboard_file}")
+        return {
+            'index.html': self.generate_main_dashboard,
+            'config.json': lambda: json.dumps(self.config, indent=2),
+            'urls.txt': urls_text
+        }
 
-        # Generate config summary
-        config_file = self.output_dir / 'config.json'
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2)
-        print(f"✅ Generated: {config_file}")
+    def generate(self, force=False):
+        """Generate all documentation files whose inputs changed"""
+        print(f"📄 Generating DocPro dashboard from {self.env_file}...")
 
-        # Generate URLs list
-        urls = self.get_service_urls()
-        urls_file = self.output_dir / 'urls.txt'
-        with open(urls_file, 'w') as f:
-            f.write(f"DocPro Service URLs (Generated: {self.timestamp})\\n")
-            f.write("=" * 50 + "\\n\\n")
-            for service, url in urls.items():
-                f.write(f"{service.replace('_', ' ').title()}: {url}\\n")
-        print(f"✅ Generated: {urls_file}")
-
-        print(f"\\n🎉 Dashboard ready at: {dashboard_file}")
+        fingerprints = self.load_fingerprints()
+        changed = 0
+        for name, render in self.render_outputs().items():
+            path = self.output_dir / name
+            fingerprint = self.input_fingerprint(name)
+            if not force and fingerprints.get(name) == fingerprint and path.exists() \
+                    and Path(f"{path}.gz").exists():
+                print(f"⏭️  Unchanged: {path}")
+                continue
+            self.write_atomic(path, render().encode('utf-8'))
+            fingerprints[name] = fingerprint
+            changed += 1
+            print(f"✅ Generated: {path}")
+
+        if changed:
+            fingerprint_file = self.output_dir / FINGERPRINT_FILE
+            with open(f"{fingerprint_file}.tmp", 'w') as f:
+                json.dump(fingerprints, f, indent=2)
+            os.replace(f"{fingerprint_file}.tmp", fingerprint_file)
+
+        print(f"\n🎉 Dashboard ready at: {self.output_dir / 'index.html'}")
         print(f"📂 Output directory: {self.output_dir.absolute()}")
+        return changed
+
+
+class DashboardRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Static handler that revalidates every response and serves precompressed .gz files"""
+
+    def end_headers(self):
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        super().end_headers()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if self.path.split('?', 1)[0].endswith('/'):
+            path = os.path.join(path, 'index.html')
+        gz_path = f"{path}.gz"
+        if 'gzip' not in self.headers.get('Accept-Encoding', '') or not os.path.isfile(path) \
+                or not os.path.isfile(gz_path):
+            return super().send_head()
+
+        f = open(gz_path, 'rb')
+        try:
+            st = os.fstat(f.fileno())
+            last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+            if self.headers.get('If-Modified-Since') == last_modified:
+                f.close()
+                self.send_response(304)
+                self.end_headers()
+                return None
+            self.send_response(200)
+            self.send_header('Content-Type', self.guess_type(path))
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(st.st_size))
+            self.send_header('Last-Modified', last_modified)
+            self.end_headers()
+            return f
+        except BaseException:
+            f.close()
+            raise
+
+
+def watch_env_file(env_file, output_dir, interval=1.0):
+    """Regenerate the dashboard whenever the .env file changes"""
+    def state():
+        try:
+            st = os.stat(env_file)
+            return st.st_ino, st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    last = state()
+    while True:
+        time.sleep(interval)
+        current = state()
+        if current != last:
+            last = current
+            print(f"\n🔄 {env_file} changed, regenerating...")
+            try:
+                DashboardGenerator(env_file, output_dir).generate()
+            except Exception as e:
+                print(f"❌ Regeneration failed: {e}")
 
 
 def main():
@@ -625,27 +734,26 @@ def main():
     parser.add_argument('--env-file', default='.env', help='Path to .env file')
     parser.add_argument('--output', default='web', help='Output directory')
     parser.add_argument('--serve', action='store_true', help='Start local web server')
+    parser.add_argument('--force', action='store_true', help='Regenerate outputs even if inputs are unchanged')
 
     args = parser.parse_args()
 
     generator = DashboardGenerator(args.env_file, args.output)
-    generator.generate()
+    generator.generate(force=args.force)
 
     if args.serve:
-        import http.server
-        import socketserver
         import webbrowser
-        import os
 
-        os.chdir(args.output)
         PORT = 8000
 
-        Handler = http.server.SimpleHTTPRequestHandler
-        with socketserver.TCPServer(("", PORT), Handler) as httpd:
-            print(f"\\n🌐 Serving dashboard at http://localhost:{PORT}")
+        threading.Thread(target=watch_env_file, args=(args.env_file, args.output), daemon=True).start()
+        Handler = functools.partial(DashboardRequestHandler, directory=args.output)
+        with http.server.ThreadingHTTPServer(("", PORT), Handler) as httpd:
+            print(f"\n🌐 Serving dashboard at http://localhost:{PORT}")
+            print(f"👀 Watching {args.env_file} for changes")
             webbrowser.open(f'http://localhost:{PORT}')
             httpd.serve_forever()
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
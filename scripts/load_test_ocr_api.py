@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+OCR API load test.
+
+Fires concurrent uploads at the OCR API and reports throughput, latency
+percentiles and how many requests were shed with 429/503. Without --files
+it uploads synthetic scans made with the OCR benchmark's generator, since
+the PDFs in sample-docs/ are empty placeholders.
+Usage: python3 scripts/load_test_ocr_api.py [--url http://localhost:8081] [--concurrency 8] [--requests 50]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'docker', 'ocr-api'))
+
+
+def multipart_body(field, filename, data):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        'Content-Type: application/pdf\r\n\r\n'
+    ).encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def post_file(url, path, timeout):
+    """POST one PDF and return (status, seconds, retry_after)"""
+    with open(path, 'rb') as f:
+        body, content_type = multipart_body('file', os.path.basename(path), f.read())
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+    start = time.monotonic()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status, time.monotonic() - start, None
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code, time.monotonic() - start, e.headers.get('Retry-After')
+    except Exception:
+        return None, time.monotonic() - start, None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+def run(url, files, total, concurrency, timeout):
+    results = []
+    lock = threading.Lock()
+
+    def one(i):
+        result = post_file(url, files[i % len(files)], timeout)
+        with lock:
+            results.append(result)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.monotonic() - start
+
+    statuses = {}
+    for status, _, _ in results:
+        key = str(status) if status else 'error'
+        statuses[key] = statuses.get(key, 0) + 1
+    ok = sorted(seconds for status, seconds, _ in results if status == 200)
+    return {
+        'url': url,
+        'requests': total,
+        'concurrency': concurrency,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(len(ok) / elapsed, 3) if elapsed else None,
+        'statuses': statuses,
+        'shed': statuses.get('429', 0) + statuses.get('503', 0),
+        'latency_seconds': {
+            'p50': percentile(ok, 50),
+            'p95': percentile(ok, 95),
+            'p99': percentile(ok, 99),
+            'max': round(ok[-1], 3) if ok else None
+        }
+    }
+
+
+def synthetic_files(page_counts, work_dir):
+    from bench import make_synthetic_pdf
+
+    files = []
+    for pages in (int(p) for p in page_counts.split(',') if p.strip()):
+        path = os.path.join(work_dir, f'synthetic-{pages}p.pdf')
+        make_synthetic_pdf(path, pages)
+        files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the DocPro OCR API')
+    parser.add_argument('--url', default=os.getenv('OCR_API_URL', 'http://localhost:8081'), help='OCR API base URL')
+    parser.add_argument('--endpoint', default='/ocr', help='Endpoint to POST files to')
+    parser.add_argument('--files', nargs='*', help='PDFs to upload (default: generated synthetic scans)')
+    parser.add_argument('--synthetic-pages', default='1,5', help='Page counts of the scans generated without --files')
+    parser.add_argument('--requests', type=int, default=50, help='Total number of requests')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--timeout', type=float, default=600, help='Per-request timeout in seconds')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='ocr-load-') as work_dir:
+        files = args.files or synthetic_files(args.synthetic_pages, work_dir)
+        if not files:
+            parser.error('no PDF files to upload')
+        empty = [path for path in files if os.path.getsize(path) == 0]
+        if empty:
+            parser.error(f"empty PDF files: {', '.join(empty)}")
+        report = run(args.url.rstrip('/') + args.endpoint, files, args.requests, args.concurrency, args.timeout)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()